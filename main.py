@@ -1,10 +1,44 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-from tkinterdnd2 import DND_FILES, TkinterDnD
-from PIL import Image, ImageTk
+from tkinterdnd2 import TkinterDnD
 import os
-import re
 import sys
+import threading
+import time
+
+from portraits import instrument
+
+# 창을 먼저 띄우도록 Pillow 와 처리 모듈은 첫 화면을 그린 뒤 load_modules 로 불러옴
+Image = ImageTk = None
+engine = jobs = manifest = prefetch = prerender = preview = resample = viewport = None
+
+def load_modules():
+    global Image, ImageTk, engine, jobs, manifest, prefetch, prerender, preview, resample, viewport
+    if engine is not None: return
+    from PIL import Image, ImageTk
+    from portraits import engine, jobs, manifest, prefetch, prerender, preview, resample, viewport
+
+def warm_up():
+    # 첫 이미지를 기다리지 않도록 이미지 플러그인과 numpy(자동 자르기) 를 미리 불러 둠
+    from portraits import autocrop
+    engine.load_plugins()
+    autocrop.available()
+
+# 시작 시간 측정 (portraits/startup.py): 첫 화면, 조작 패널 준비, 끌어다 놓기 준비 시점을 기록함
+# PORTRAITS_STARTUP_PROBE 가 켜져 있으면 표준 출력으로도 알리고, 모두 준비되면 종료함
+STARTED = time.perf_counter()
+STARTUP_PROBE = os.environ.get("PORTRAITS_STARTUP_PROBE", "") not in ("", "0")
+
+def startup_mark(stage):
+    ms = (time.perf_counter() - STARTED) * 1000
+    instrument.record("startup", mark=stage, ms=round(ms, 3))
+    if STARTUP_PROBE: print(f"startup {stage} {ms:.1f}", flush=True)
+
+class Root(TkinterDnD.Tk):
+    # tkdnd 확장(package require) 은 창을 띄운 뒤 PortraitMaker.enable_drop 에서 불러옴
+    def __init__(self):
+        tk.Tk.__init__(self)
+        self.TkdndVersion = None
 
 class PortraitMaker:
     def __init__(self, root):
@@ -57,9 +91,35 @@ class PortraitMaker:
         
         self.last_width = start_w
         self.last_height = start_h
+        self.resize_job = None
+        self.resize_delay = 120
+        # 드래그 이벤트는 모아서 화면 주사율(약 60fps) 마다 한 번만 처리
+        self.drag_job = None
+        self.drag_delay = 16
+        self.drag_pos = None
+        # 자르기 영역 좌표와 단계별 이동 범위/비율 (캔버스에 매번 묻지 않음)
+        self.rect_coords = None
+        self.drag_bounds, self.drag_ratio, self.drag_target = None, 1.0, None
+        # 실제 크기 미리보기가 이보다 높으면 줄여서 표시
+        self.live_max_h = 160
+        self.tk_live_img = None
+        self.canvas_cursor = None
+        # 확대/이동: view_scale 은 화면 px / 원본 px, view_origin 은 화면 왼쪽 위의 원본 좌표
+        self.zoom_level = 0
+        self.view_scale, self.view_origin = 1.0, (0.0, 0.0)
+        self.tiles = None
+        self.view_photos = {}
+        self.pan_job = self.pan_pos = self.pan_applied = None
         self.root.configure(bg=self.bg_dark)
         
         self.original_img = None
+        self.display_pyramid = None
+        self.source_path = self.source_hash = self.manifest = None
+        # 자동 자르기 추천 (단계마다 점수 순 후보, 오른쪽 클릭으로 바꿈)
+        self.proposer = None
+        self.proposals, self.proposal_idx = [], 0
+        self.preview_cache = None
+        self.image_serial = 0
         self.display_img = None
         self.tk_display_img = None
         self.scale_ratio = 1.0
@@ -67,45 +127,73 @@ class PortraitMaker:
         self.step_idx = 0
         self.is_high_res = False 
 
-        # 게임 설정 구성
-        self.configs = {
-            "D&D EE (BG1, BG2, IWD1)": {
-                "steps": ["Large", "Medium"], 
-                "sizes": {"Large": (210, 330), "Medium": (76, 118)}, 
-                "max_h": 512, 
-                "format": "BMP", "suffix": {"Large": "L", "Medium": "M"}
-            },
-            "D&D Classics (BG1, BG2, IWD1)": {
-                "steps": ["Large", "Medium", "Small"], 
-                "sizes": {"Large": (210, 330), "Medium": (110, 170), "Small": (38, 60)},
-                "format": "BMP", "suffix": {"Large": "L", "Medium": "M", "Small": "S"}
-            },
-            "Icewind Dale 2 Classic": {
-                "steps": ["Large", "Small"], 
-                "sizes": {"Large": (210, 330), "Small": (42, 42)},
-                "format": "BMP", "suffix": {"Large": "L", "Small": "S"}
-            },
-            "Pathfinder: Kingmaker & WotR": {
-                "steps": ["FullLength", "Medium", "Small"], 
-                "sizes": {"FullLength": (692, 1024), "Medium": (330, 432), "Small": (185, 242)},
-                "format": "PNG", "use_folder": True
-            },
-            "Pillars of Eternity 1 & 2": {
-                "steps": ["Large", "Small"],
-                "sizes": {"Large": (210, 330), "Small": (76, 96)},
-                "format": "PNG", "suffix": {"Large": "_lg", "Small": "_sm"}
-            }
-        }
+        # 게임 설정 구성 (finish_startup 에서 채움)
+        self.configs = {}
 
+        # 작업 종류별로 실행 중 잠글 버튼
+        self.job_locks = {
+            "load": ("btn_next", "btn_retry", "btn_save", "btn_high_res", "btn_next_image"),
+            "review": ("btn_save", "btn_high_res"),
+            "save": ("btn_load", "btn_retry", "btn_save", "btn_high_res", "game_select", "all_games_check", "btn_next_image"),
+        }
+        self.locked_states = {}
+        self.jobs = self.prerender = self.prefetch = None
+        self.render_keys = {}
+        # 여러 장을 끌어다 놓으면 차례대로 처리하고, 다음 이미지는 미리 디코딩해 둠
+        self.queue, self.queue_names = [], []
+        self.queue_idx = 0
+
+        self.all_games_var = tk.BooleanVar(value=False)
         self.char_name_var = tk.StringVar(value="MYCHAR")
         self.char_name_var.trace_add("write", self.limit_char_name)
         
+        # 첫 화면(머리글과 작업 영역) 만 먼저 만들고, 창이 그려지면(Expose) 나머지를 만듦
+        # 창이 가려져서 그려지지 않더라도 잠시 뒤에는 만듦
+        self.setup_shell()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.work_panel.bind("<Expose>", self.on_first_frame)
+        self.startup_job = self.root.after(500, self.on_first_frame)
+
+    def on_first_frame(self, event=None):
+        if self.startup_job is None: return
+        self.root.after_cancel(self.startup_job)
+        self.startup_job = None
+        self.work_panel.unbind("<Expose>")
+        # 받아 둔 다시 그리기를 끝내서 첫 화면을 내보낸 뒤 나머지를 만듦
+        self.root.update_idletasks()
+        startup_mark("first_frame")
+        self.root.after(1, self.finish_startup)
+
+    @instrument.traced("startup.finish")
+    def finish_startup(self):
+        # Pillow 와 처리 모듈을 불러오고 조작 패널을 만듦
+        load_modules()
+        self.configs = engine.GAME_CONFIGS
+        self.preview_cache = preview.PreviewCache()
+        self.jobs = jobs.JobRunner(self.root, on_change=self.update_job_ui)
+        self.prerender = prerender.Prerenderer()
+        self.prefetch = prefetch.Prefetcher()
         self.setup_styles()
-        self.setup_ui()
+        self.setup_controls()
+        self.status_label.config(text="이미지 파일을 이 곳에 끌어다 놓으세요")
         self.root.bind("<Configure>", self.on_window_resize)
+        startup_mark("ready")
+        self.root.after(1, self.enable_drop)
 
-        self.root.drop_target_register(DND_FILES)
-        self.root.dnd_bind('<<Drop>>', self.handle_drop)
+    def enable_drop(self):
+        # tkdnd 확장을 불러와 끌어다 놓기를 켬. 불러오지 못하면 '이미지 불러오기' 버튼만 씀
+        try:
+            from tkinterdnd2 import DND_FILES
+            self.root.TkdndVersion = TkinterDnD._require(self.root)
+            self.root.drop_target_register(DND_FILES)
+            self.root.dnd_bind('<<Drop>>', self.handle_drop)
+        except (RuntimeError, tk.TclError) as e:
+            print(f"끌어다 놓기를 사용할 수 없습니다: {e}")
+        startup_mark("drop")
+        if STARTUP_PROBE:
+            self.on_close()
+            return
+        threading.Thread(target=warm_up, name="portraits-warmup", daemon=True).start()
 
     def setup_styles(self):
         style = ttk.Style()
@@ -120,8 +208,13 @@ class PortraitMaker:
         style.map("TRadiobutton", 
                   background=[('active', self.bg_panel)], # 마우스 올렸을 때 배경색을 패널색으로 고정
                   foreground=[('active', self.accent_color)]) # 마우스 올렸을 때 글자색만 강조
+        style.configure("TCheckbutton", background=self.bg_panel, foreground=self.text_white, font=("Malgun Gothic", 10), focuscolor=self.bg_panel)
+        style.map("TCheckbutton", background=[('active', self.bg_panel)], foreground=[('active', self.accent_color)])
+
+        # 작업 진행 막대
+        style.configure("Job.Horizontal.TProgressbar", troughcolor=self.bg_dark, background=self.accent_color, bordercolor=self.bg_panel, lightcolor=self.accent_color, darkcolor=self.accent_color)
 
-    def setup_ui(self):
+    def setup_shell(self):
         self.header = tk.Frame(self.root, bg=self.bg_dark)
         self.header.pack(side="top", fill="x")
         tk.Label(self.header, text="Portraits Maker", font=("Malgun Gothic", 22, "bold"), fg=self.text_white, bg=self.bg_dark, pady=20).pack()
@@ -129,8 +222,38 @@ class PortraitMaker:
         self.main_container = tk.Frame(self.root, bg=self.bg_dark)
         self.main_container.pack(expand=True, fill="both")
 
+        self.work_panel = tk.Frame(self.main_container, bg=self.bg_dark)
+        self.work_panel.pack(side="left", expand=True, fill="both", padx=10, pady=10)
+
+        self.status_label = tk.Label(self.work_panel, text="준비 중...", fg=self.text_gray, bg=self.bg_dark, font=("Malgun Gothic", 14))
+        self.status_label.pack(expand=True)
+
+        self.workspace = tk.Frame(self.work_panel, bg=self.bg_dark)
+        self.workspace.pack(expand=True, fill="both")
+
+        self.canvas = tk.Canvas(self.workspace, bg=self.bg_dark, highlightthickness=0, bd=0)
+        self.canvas.place(relx=0.5, rely=0.5, anchor="center")
+        self.canvas.bind("<ButtonPress-1>", self.on_click)
+        self.canvas.bind("<B1-Motion>", self.on_drag)
+        self.canvas.bind("<ButtonRelease-1>", self.flush_drag)
+        self.canvas.bind("<Motion>", self.update_cursor)
+        self.canvas.bind("<Button-3>", self.cycle_proposal)
+        # 휠: 확대/축소, 가운데 버튼(또는 Shift+왼쪽 버튼) 드래그: 화면 이동
+        self.canvas.bind("<MouseWheel>", self.on_wheel)
+        self.canvas.bind("<Button-4>", self.on_wheel)
+        self.canvas.bind("<Button-5>", self.on_wheel)
+        for press, motion in (("<ButtonPress-2>", "<B2-Motion>"), ("<Shift-ButtonPress-1>", "<Shift-B1-Motion>")):
+            self.canvas.bind(press, self.on_pan_start)
+            self.canvas.bind(motion, self.on_pan)
+
+        self.btn_next = tk.Button(self.work_panel, text="자르기 ▶", command=self.next_step, bg=self.accent_color, fg=self.bg_dark, font=self.bold_font, relief="flat", state="disabled")
+
+        self.review_frame = tk.Frame(self.workspace, bg=self.bg_dark)
+
+    def setup_controls(self):
+        # 오른쪽 조작 패널. 작업 영역보다 먼저 배치한 것처럼 before 로 넣음
         self.ctrl_panel = tk.Frame(self.main_container, width=320, bg=self.bg_panel, padx=25, pady=30)
-        self.ctrl_panel.pack(side="right", fill="y", padx=10, pady=10)
+        self.ctrl_panel.pack(side="right", fill="y", padx=10, pady=10, before=self.work_panel)
         self.ctrl_panel.pack_propagate(False)
 
         # 게임 선택
@@ -153,12 +276,38 @@ class PortraitMaker:
         ttk.Radiobutton(self.color_frame, text="흰색", variable=self.frame_color_var, value="#ffffff", command=self.update_rect_color, style="TRadiobutton").pack(side="left", padx=(0, 20))
         ttk.Radiobutton(self.color_frame, text="빨간색", variable=self.frame_color_var, value="#ff0000", command=self.update_rect_color, style="TRadiobutton").pack(side="left")
 
+        # 한 번 자른 결과를 모든 게임 형식으로 저장
+        self.all_games_check = ttk.Checkbutton(self.ctrl_panel, text="모든 게임으로 한 번에 저장", variable=self.all_games_var, style="TCheckbutton")
+        self.all_games_check.pack(anchor="w", pady=(0, 20))
+
         self.btn_load = tk.Button(self.ctrl_panel, text="이미지 불러오기", command=self.load_image, bg="#333a45", fg=self.text_white, font=self.bold_font, activebackground=self.accent_color, relief="flat", cursor="hand2")
         self.btn_load.pack(fill="x", ipady=12)
 
+        # 대기열 (여러 장을 불러왔을 때만 표시)
+        self.queue_frame = tk.Frame(self.ctrl_panel, bg=self.bg_panel)
+        self.queue_label = tk.Label(self.queue_frame, text="", font=("Malgun Gothic", 10), fg=self.text_gray, bg=self.bg_panel, anchor="w")
+        self.queue_label.pack(fill="x")
+        self.btn_next_image = tk.Button(self.queue_frame, text="다음 이미지 ▶", command=self.next_image, bg="#333a45", fg=self.text_white, font=("Malgun Gothic", 10), relief="flat", cursor="hand2")
+        self.btn_next_image.pack(fill="x", ipady=4, pady=(5, 0))
+
+        # 작업 진행 상황 (작업 중에만 표시)
+        self.job_frame = tk.Frame(self.ctrl_panel, bg=self.bg_panel)
+        self.job_label = tk.Label(self.job_frame, text="", font=("Malgun Gothic", 10), fg=self.text_gray, bg=self.bg_panel)
+        self.job_label.pack(anchor="w")
+        self.job_progress = ttk.Progressbar(self.job_frame, mode="determinate", style="Job.Horizontal.TProgressbar")
+        self.job_progress.pack(fill="x", pady=(5, 5))
+        self.btn_cancel = tk.Button(self.job_frame, text="취소", command=self.cancel_save, bg="#333a45", fg=self.text_white, font=("Malgun Gothic", 10), relief="flat", cursor="hand2")
+
         self.bottom_btn_frame = tk.Frame(self.ctrl_panel, bg=self.bg_panel)
         self.bottom_btn_frame.pack(side="bottom", fill="x")
 
+        # 자르기 중 실제 출력 크기 미리보기 (자르기 단계에서만 표시)
+        self.live_frame = tk.Frame(self.ctrl_panel, bg=self.bg_panel)
+        self.live_caption = tk.Label(self.live_frame, text="", font=("Malgun Gothic", 10), fg=self.text_gray, bg=self.bg_panel, anchor="w")
+        self.live_caption.pack(fill="x")
+        self.live_label = tk.Label(self.live_frame, bg=self.bg_dark, bd=0)
+        self.live_label.pack(anchor="w", pady=(5, 0))
+
         self.btn_high_res = tk.Button(self.bottom_btn_frame, text="고해상도 모드: OFF", command=self.toggle_high_res, bg="#444444", fg=self.btn_disabled_fg, font=self.main_font, relief="flat", state="disabled")
         self.btn_high_res.pack(fill="x", ipady=12, pady=(0, 10))
 
@@ -168,25 +317,6 @@ class PortraitMaker:
         self.btn_save = tk.Button(self.bottom_btn_frame, text="최종 저장", command=self.save_portraits, bg="#444444", fg=self.btn_disabled_fg, font=self.bold_font, relief="flat", state="disabled")
         self.btn_save.pack(fill="x", ipady=15)
 
-        self.work_panel = tk.Frame(self.main_container, bg=self.bg_dark)
-        self.work_panel.pack(side="left", expand=True, fill="both", padx=10, pady=10)
-
-        self.status_label = tk.Label(self.work_panel, text="이미지 파일을 이 곳에 끌어다 놓으세요", fg=self.text_gray, bg=self.bg_dark, font=("Malgun Gothic", 14))
-        self.status_label.pack(expand=True)
-
-        self.workspace = tk.Frame(self.work_panel, bg=self.bg_dark)
-        self.workspace.pack(expand=True, fill="both")
-
-        self.canvas = tk.Canvas(self.workspace, bg=self.bg_dark, highlightthickness=0, bd=0)
-        self.canvas.place(relx=0.5, rely=0.5, anchor="center")
-        self.canvas.bind("<ButtonPress-1>", self.on_click)
-        self.canvas.bind("<B1-Motion>", self.on_drag)
-        self.canvas.bind("<Motion>", self.update_cursor)
-
-        self.btn_next = tk.Button(self.work_panel, text="자르기 ▶", command=self.next_step, bg=self.accent_color, fg=self.bg_dark, font=self.bold_font, relief="flat", state="disabled")
-
-        self.review_frame = tk.Frame(self.workspace, bg=self.bg_dark)
-        
         self.check_ee_selection()
 
     def update_rect_color(self):
@@ -195,11 +325,14 @@ class PortraitMaker:
 
     def on_game_change(self, event=None):
         self.is_high_res = False
+        # 새 게임에 없는 단계의 미리 만든 결과만 버림
+        steps = self.configs[self.game_select.get()]["steps"]
+        for label in [l for l in self.render_keys if l not in steps]: self.prerender.discard(self.render_keys.pop(label).values())
         self.check_ee_selection()
         self.reset_crop_process()
 
     def check_ee_selection(self):
-        if self.game_select.get() == "D&D EE (BG1, BG2, IWD1)":
+        if self.game_select.get() == engine.EE_GAME:
             self.btn_high_res.config(state="normal", bg="#333a45", fg=self.text_white)
             self.update_high_res_button_ui()
         else:
@@ -218,25 +351,109 @@ class PortraitMaker:
         else:
             self.btn_high_res.config(text="고해상도 모드: OFF (표준 512)", bg="#333a45")
 
+    @instrument.traced("handle_drop")
     def handle_drop(self, event):
-        path = event.data
-        if path.startswith('{') and path.endswith('}'): path = path[1:-1]
-        valid_extensions = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
-        if path.lower().endswith(valid_extensions): self.process_image(path)
+        if self.jobs.busy("save"): return
+        # 여러 파일은 Tcl 목록 ({공백 있는 경로} 포함) 으로 들어옴
+        paths = [p for p in self.root.tk.splitlist(event.data) if engine.is_supported_image(p)]
+        if paths: self.set_queue(paths)
         else: messagebox.showwarning("경고", "지원하지 않는 파일 형식입니다.")
 
     def load_image(self):
-        path = filedialog.askopenfilename(filetypes=[("이미지 파일", "*.jpg *.jpeg *.png *.bmp *.webp")])
-        if not path: return
-        self.process_image(path)
-
+        paths = filedialog.askopenfilenames(filetypes=[("이미지 파일", "*.jpg *.jpeg *.png *.bmp *.webp")])
+        if not paths: return
+        self.set_queue(list(paths))
+
+    def set_queue(self, paths):
+        # 여러 장이면 캐릭터 이름을 파일 이름에서 따옴 (같은 이름으로 덮어쓰지 않도록)
+        used = set()
+        self.queue_names = [engine.unique_char_name(p, used) for p in paths] if len(paths) > 1 else []
+        self.queue, self.queue_idx = paths, 0
+        self.prefetch.clear()
+        self.process_image(paths[0])
+
+    def next_image(self):
+        if self.queue_idx + 1 >= len(self.queue): return
+        self.queue_idx += 1
+        self.process_image(self.queue[self.queue_idx])
+
+    def update_queue_ui(self):
+        if len(self.queue) <= 1:
+            self.queue_frame.pack_forget()
+            return
+        self.queue_label.config(text=f"이미지 {self.queue_idx + 1} / {len(self.queue)}: {os.path.basename(self.queue[self.queue_idx])}")
+        self.btn_next_image.config(state="normal" if self.queue_idx + 1 < len(self.queue) else "disabled")
+        if not self.queue_frame.winfo_manager(): self.queue_frame.pack(fill="x", pady=(10, 0), after=self.btn_load)
+
+    def screen_size(self):
+        return self.root.winfo_screenwidth(), self.root.winfo_screenheight()
+
+    @instrument.traced("process_image")
     def process_image(self, path):
+        future = self.prefetch.take(path)
+        if future: self.jobs.submit("load", "이미지 불러오는 중", self.wait_prefetched, future, on_done=self.on_image_loaded, on_error=self.on_image_error)
+        else: self.jobs.submit("load", "이미지 불러오는 중", self.decode_image, path, self.screen_size(), on_done=self.on_image_loaded, on_error=self.on_image_error)
+
+    @staticmethod
+    @instrument.traced("process_image.decode")
+    def decode_image(job, path, max_size):
+        # 작업 스레드: 원본 디코딩과 화면 표시용 축소 피라미드 생성, 자르기 기록 확인용 해시
+        job.report(0, 1)
+        result = prefetch.load_entry(path, max_size)
+        job.report(1, 1)
+        return result
+
+    @staticmethod
+    @instrument.traced("process_image.prefetched")
+    def wait_prefetched(job, future):
+        # 미리 디코딩한 결과. 아직 디코딩 중이면 끝날 때까지 기다림
+        job.report(0, 1)
+        result = future.result()
+        job.report(1, 1)
+        return result
+
+    @instrument.traced("process_image.apply")
+    def on_image_loaded(self, result):
         try:
-            self.original_img = Image.open(path)
+            self.release_image()
+            self.original_img, self.display_pyramid, self.source_path, self.source_hash, self.proposer = result
+            self.manifest = manifest.load(manifest.manifest_path(self.source_path))
+            self.image_serial += 1
             self.refresh_display_size()
             self.reset_crop_process()
-        except Exception as e: messagebox.showerror("에러", f"이미지를 불러올 수 없습니다: {e}")
-
+            if self.queue_names:
+                saved = self.manifest and self.manifest.get("source_hash") == self.source_hash and self.manifest.get("name")
+                self.char_name_var.set(saved or self.queue_names[self.queue_idx])
+            self.update_queue_ui()
+            self.prefetch.request(self.queue[self.queue_idx + 1:], self.screen_size())
+        except Exception as e: self.on_image_error(e)
+
+    def on_image_error(self, e):
+        messagebox.showerror("에러", f"이미지를 불러올 수 없습니다: {e}")
+
+    def release_image(self):
+        # 이전 이미지의 원본, 화면 표시용 이미지, 미리보기, 미리 만든 결과를 모두 해제
+        self.jobs.discard("review")
+        self.prerender.clear()
+        self.render_keys = {}
+        self.preview_cache.clear()
+        for widget in self.review_frame.winfo_children(): widget.destroy()
+        self.canvas.delete("all")
+        self.cancel_drag()
+        self.cancel_pan()
+        self.live_frame.pack_forget()
+        self.view_photos = {}
+        if self.tiles: self.tiles.clear()
+        self.tiles = None
+        self.zoom_level, self.view_origin = 0, (0.0, 0.0)
+        self.tk_display_img = self.display_img = self.tk_live_img = None
+        if self.display_pyramid: self.display_pyramid.close()
+        if self.original_img: self.original_img.close()
+        self.display_pyramid = self.original_img = None
+        self.source_path = self.source_hash = self.manifest = self.proposer = None
+        self.proposals = []
+
+    @instrument.traced("refresh_display_size")
     def refresh_display_size(self):
         if not self.original_img: return
         self.root.update_idletasks()
@@ -244,15 +461,22 @@ class PortraitMaker:
         avail_w = self.work_panel.winfo_width() - (self.safe_margin * 2)
         if avail_h < 100 or avail_w < 100: return
         img_w, img_h = self.original_img.size
+        # 창 크기가 바뀌어도 확대 단계와 화면 가운데의 원본 위치는 유지
+        center = self.view_center() if self.display_img else None
         self.scale_ratio = min(avail_w/img_w, avail_h/img_h, 1.0)
         display_w, display_h = int(img_w * self.scale_ratio), int(img_h * self.scale_ratio)
-        self.display_img = self.original_img.resize((display_w, display_h), Image.LANCZOS)
+        size = (display_w, display_h)
+        self.display_img = self.preview_cache.get((self.image_serial, None, size), lambda: self.display_pyramid.render(size))
         self.tk_display_img = ImageTk.PhotoImage(self.display_img)
         self.canvas.config(width=display_w + (self.safe_margin * 2), height=display_h + (self.safe_margin * 2))
+        if not self.tiles: self.tiles = viewport.TiledView(self.display_pyramid, self.original_img, self.image_serial)
+        self.set_view(self.zoom_level, center)
 
     def reset_crop_process(self):
         if not self.original_img: return
+        self.jobs.discard("review")
         game_cfg = self.configs[self.game_select.get()]
+        # crops 에는 원본 좌표의 자르기 영역만 두고, 실제 픽셀은 출력 만들 때 읽음
         self.step_idx, self.current_steps, self.crops = 0, game_cfg["steps"], {}
         self.step = "CROPPING"
         self.review_frame.place_forget()
@@ -268,27 +492,189 @@ class PortraitMaker:
         if self.step_idx < len(self.current_steps):
             label = self.current_steps[self.step_idx]
             self.btn_next.config(text=f"{label} 자르기 ▶")
-            self.status_label.config(text=f"{label} 사이즈로 사용할 부분을 선택해 주세요", fg=self.text_white)
+            hint = " (휠: 확대, 가운데 버튼 드래그: 이동" + (", 오른쪽 클릭: 다른 추천 영역)" if self.proposer else ")")
+            self.status_label.config(text=f"{label} 사이즈로 사용할 부분을 선택해 주세요{hint}", fg=self.text_white)
             self.status_label.pack(pady=20, side="top", expand=False)
 
-    def init_crop_frame(self):
+    def init_crop_frame(self, norm_box=None):
+        self.cancel_drag()
+        self.cancel_pan()
+        # 새 단계는 전체 화면(맞춤 배율)에서 시작. 창 크기 변경(norm_box 있음)은 확대 상태 유지
+        if norm_box is None: self.set_view(0)
         self.canvas.delete("all")
-        self.canvas.create_image(self.safe_margin, self.safe_margin, anchor="nw", image=self.tk_display_img)
-        w, h = self.display_img.width, self.display_img.height
+        self.view_photos = {}
+        self.draw_view()
+        w, h = self.original_img.size
         target_size = self.configs[self.game_select.get()]["sizes"][self.current_steps[self.step_idx]]
-        r = target_size[0] / target_size[1]
-        bw = w * 0.7
-        bh = bw / r
-        if bh > h * 0.9: 
-            bh = h * 0.8
-            bw = bh * r
-        x1, y1 = ((w - bw) / 2) + self.safe_margin, ((h - bh) / 2) + self.safe_margin
-        x2, y2 = x1 + bw, y1 + bh
-        self.rect_id = self.canvas.create_rectangle(x1, y1, x2, y2, outline=self.frame_color_var.get(), width=self.rect_width)
+        if norm_box is None:
+            # 추천 영역은 단계마다 새로 구함 (이전 단계의 다른 비율 영역이 남지 않도록). 아직 고르지 않은 상태(-1) 에서 시작
+            self.proposals, self.proposal_idx = self.proposer.propose(target_size) if self.proposer else [], -1
+        # 같은 원본을 전에 잘라 둔 적이 있으면 그 영역에서 시작
+        norm_box = norm_box or manifest.saved_crops(self.manifest, self.source_hash, self.game_select.get()).get(self.current_steps[self.step_idx])
+        if norm_box:
+            # 창 크기가 바뀌어도 같은 영역을 유지 (0~1 정규화 좌표)
+            coords = self.to_canvas((norm_box[0] * w, norm_box[1] * h, norm_box[2] * w, norm_box[3] * h))
+        elif self.proposals:
+            # 처음 자르는 원본이면 자동 추천 1순위에서 시작
+            self.proposal_idx = 0
+            coords = self.fit_rect(self.to_canvas(self.proposals[0]))
+        else:
+            coords = self.to_canvas(engine.default_crop_box(w, h, target_size))
+        self.rect_id = self.canvas.create_rectangle(*coords, outline=self.frame_color_var.get(), width=self.rect_width)
+        self.prepare_drag(coords)
+
+    def prepare_drag(self, coords):
+        # 단계마다 한 번: 이동 범위와 목표 비율을 미리 구해 둠 (드래그 중에는 설정/위젯을 다시 읽지 않음)
+        game, label = self.game_select.get(), self.current_steps[self.step_idx]
+        target_size = self.configs[game]["sizes"][label]
+        self.drag_bounds = self.image_bounds()
+        self.drag_ratio = target_size[1] / target_size[0]
+        self.drag_target = (game, label)
+        self.rect_coords = list(coords)
+        if not self.live_frame.winfo_manager(): self.live_frame.pack(side="bottom", fill="x", pady=(0, 20), after=self.bottom_btn_frame)
+        self.update_live_preview()
+
+    def set_rect(self, x1, y1, x2, y2):
+        self.rect_coords = [x1, y1, x2, y2]
+        self.canvas.coords(self.rect_id, x1, y1, x2, y2)
+
+    @instrument.traced("live_preview")
+    def update_live_preview(self):
+        # 지금 영역을 실제 출력 크기로 보여줌. 화면에 그린 축소본에서 잘라 만들므로 원본은 건드리지 않음
+        # 저장할 때와 같이 가장자리를 붙인 정수 원본 영역으로 출력 크기를 정함 (작은 영역은 소수 크기가 그대로 나오므로)
+        w, h = self.display_img.width, self.display_img.height
+        src_box = self.get_current_box()
+        x1, y1, x2, y2 = (v * self.scale_ratio for v in src_box)
+        box = (max(0, x1), max(0, y1), min(w, x2), min(h, y2))
+        game, label = self.drag_target
+        size = tuple(round(v) for v in engine.output_size(game, label, engine.box_size(src_box), self.is_high_res))
+        shown = size if size[1] <= self.live_max_h else (max(1, round(size[0] * self.live_max_h / size[1])), self.live_max_h)
+        self.tk_live_img = ImageTk.PhotoImage(self.display_img.resize(shown, Image.BILINEAR, box=box, reducing_gap=2.0))
+        self.live_label.config(image=self.tk_live_img)
+        self.live_caption.config(text=f"실제 크기 미리보기 {size[0]}x{size[1]}" + ("" if shown == size else " (축소 표시)"))
+
+    # --- 확대/이동 화면 ---
+    def to_canvas(self, box):
+        # 원본 좌표 영역 -> 캔버스 좌표
+        s, (ox, oy), m = self.view_scale, self.view_origin, self.safe_margin
+        return (box[0] - ox) * s + m, (box[1] - oy) * s + m, (box[2] - ox) * s + m, (box[3] - oy) * s + m
+
+    def to_source(self, coords):
+        s, (ox, oy), m = self.view_scale, self.view_origin, self.safe_margin
+        return (coords[0] - m) / s + ox, (coords[1] - m) / s + oy, (coords[2] - m) / s + ox, (coords[3] - m) / s + oy
+
+    def image_bounds(self):
+        # 자르기 영역이 움직일 수 있는 범위 (캔버스 좌표). 확대 중에는 화면 밖까지 이어짐
+        x1, y1, x2, y2 = self.to_canvas((0, 0) + self.original_img.size)
+        return x1, y1 + self.frame_padding, x2 - 1, y2 - self.frame_padding - 2
+
+    def fit_rect(self, coords):
+        # 비율을 유지한 채 on_drag 의 이동 범위 안으로 줄여 넣음
+        min_x, min_y, max_x, max_y = self.image_bounds()
+        x1, y1, x2, y2 = coords
+        bw, bh = x2 - x1, y2 - y1
+        fit = min(1.0, (max_x - min_x) / bw, (max_y - min_y) / bh)
+        cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+        bw, bh = bw * fit, bh * fit
+        x1 = min(max(cx - bw / 2, min_x), max_x - bw)
+        y1 = min(max(cy - bh / 2, min_y), max_y - bh)
+        return x1, y1, x1 + bw, y1 + bh
+
+    def view_center(self):
+        m = self.safe_margin
+        return self.to_source((m + self.display_img.width / 2, m + self.display_img.height / 2) * 2)[:2]
+
+    def set_view(self, level, focus=None, anchor=None):
+        # 원본의 focus 지점이 캔버스의 anchor 위치에 오도록 배율과 위치를 정함 (기본: 화면 가운데)
+        m, view_size = self.safe_margin, self.display_img.size
+        self.zoom_level = min(max(0, level), viewport.max_zoom_level(self.scale_ratio))
+        self.view_scale = viewport.zoom_scale(self.scale_ratio, self.zoom_level)
+        fx, fy = focus or (0.0, 0.0)
+        ax, ay = anchor or (m + view_size[0] / 2, m + view_size[1] / 2)
+        origin = (fx - (ax - m) / self.view_scale, fy - (ay - m) / self.view_scale)
+        # 맞춤 배율에서는 화면 표시용 이미지를 그대로 그리므로 원점 고정
+        self.view_origin = viewport.clamp_origin(origin, self.view_scale, view_size, self.original_img.size) if self.zoom_level else (0.0, 0.0)
+
+    def draw_view(self):
+        # 맞춤 배율이면 화면 표시용 이미지 하나, 확대 중이면 보이는 타일만 그림
+        m = self.safe_margin
+        self.canvas.delete("view")
+        if self.zoom_level == 0:
+            self.view_photos = {}
+            self.canvas.create_image(m, m, anchor="nw", image=self.tk_display_img, tags="view")
+        else:
+            # PhotoImage 는 보이는 타일 것만 두고, 타일 이미지는 TiledView 의 LRU 캐시에 둠
+            photos = {}
+            for key, x, y in self.tiles.visible(self.view_scale, self.view_origin, self.display_img.size):
+                photos[key] = self.view_photos.get(key) or ImageTk.PhotoImage(self.tiles.tile(key))
+                self.canvas.create_image(m + x, m + y, anchor="nw", image=photos[key], tags="view")
+            self.view_photos = photos
+            # 화면 밖(여백)으로 나온 타일 부분은 배경색으로 가림
+            cw, ch = self.display_img.width + m * 2, self.display_img.height + m * 2
+            for box in ((0, 0, cw, m), (0, ch - m, cw, ch), (0, m, m, ch - m), (cw - m, m, cw, ch - m)):
+                self.canvas.create_rectangle(*box, fill=self.bg_dark, outline="", tags="view")
+        self.canvas.tag_lower("view")
+
+    def on_wheel(self, event):
+        if self.step != "CROPPING" or not self.rect_coords: return
+        step = 1 if event.num == 4 or getattr(event, "delta", 0) > 0 else -1
+        if min(max(0, self.zoom_level + step), viewport.max_zoom_level(self.scale_ratio)) == self.zoom_level: return
+        # 마우스 아래의 원본 지점을 기준으로 확대/축소
+        self.change_view(self.zoom_level + step, self.to_source((event.x, event.y) * 2)[:2], (event.x, event.y))
+
+    def on_pan_start(self, event):
+        if self.step != "CROPPING": return
+        self.flush_drag()
+        self.pan_pos = self.pan_applied = (event.x, event.y)
+
+    def on_pan(self, event):
+        # on_drag 와 같이 한 프레임에 한 번만 화면을 옮김
+        if self.step != "CROPPING" or self.zoom_level == 0 or not self.pan_applied: return
+        self.pan_pos = (event.x, event.y)
+        if not self.pan_job: self.pan_job = self.root.after(self.drag_delay, self.apply_pan)
+
+    def cancel_pan(self):
+        if self.pan_job: self.root.after_cancel(self.pan_job)
+        self.pan_job = self.pan_pos = self.pan_applied = None
+
+    def apply_pan(self):
+        self.pan_job = None
+        if self.step != "CROPPING" or not self.pan_pos: return
+        dx, dy = self.pan_pos[0] - self.pan_applied[0], self.pan_pos[1] - self.pan_applied[1]
+        self.pan_applied = self.pan_pos
+        cx, cy = self.view_center()
+        self.change_view(self.zoom_level, (cx - dx / self.view_scale, cy - dy / self.view_scale))
+
+    @instrument.traced("change_view")
+    def change_view(self, level, focus=None, anchor=None):
+        # 배율/위치를 바꾸고 다시 그린 뒤, 자르기 영역을 같은 원본 위치로 옮김
+        # 가장자리에 붙은 영역은 확대해도 붙어 있도록 붙임까지 적용한 영역을 기준으로 함
+        rect = self.get_current_box()
+        self.set_view(level, focus, anchor)
+        self.draw_view()
+        self.set_rect(*self.to_canvas(rect))
+        self.drag_bounds = self.image_bounds()
+
+    def cycle_proposal(self, event=None):
+        # 오른쪽 클릭: 같은 단계의 다음 추천 영역으로 바꿈. 지금 단계의 비율과 다른 영역은 건너뜀
+        if self.step != "CROPPING" or not self.proposals: return
+        n = len(self.proposals)
+        for i in range(self.proposal_idx + 1, self.proposal_idx + 1 + n):
+            bw, bh = engine.box_size(self.proposals[i % n])
+            if abs(bh / bw / self.drag_ratio - 1) <= engine.ASPECT_TOLERANCE: break
+        else: return
+        self.proposal_idx = i % n
+        self.cancel_drag()
+        self.set_rect(*self.fit_rect(self.to_canvas(self.proposals[self.proposal_idx])))
+        self.update_live_preview()
 
     def next_step(self):
         if self.step != "CROPPING": return
-        self.crops[self.current_steps[self.step_idx]] = self.get_current_crop()
+        self.flush_drag()
+        label = self.current_steps[self.step_idx]
+        self.crops[label] = self.get_current_box()
+        self.request_renders(label)
+        self.manifest = self.record_manifest({self.game_select.get(): dict(self.crops)}) or self.manifest
         self.step_idx += 1
         if self.step_idx < len(self.current_steps):
             self.update_step_ui()
@@ -296,66 +682,75 @@ class PortraitMaker:
         else:
             self.show_review()
 
+    def request_renders(self, label):
+        # 확정된 자르기의 최종 출력을 표준/고해상도 모두 미리 만들어 둠 (EE 외 게임은 크기가 같아 한 번만 만들어짐)
+        game, box = self.game_select.get(), self.crops[label]
+        keys = {hr: self.prerender.request(self.image_serial, self.original_img, box, engine.output_size(game, label, engine.box_size(box), hr)) for hr in (False, True)}
+        old = self.render_keys.get(label)
+        if old: self.prerender.discard(set(old.values()) - set(keys.values()))
+        self.render_keys[label] = keys
+
+    def get_norm_box(self):
+        w, h = self.original_img.size
+        x1, y1, x2, y2 = self.to_source(self.rect_coords)
+        return x1 / w, y1 / h, x2 / w, y2 / h
+
+    def get_current_box(self):
+        # 가장자리 붙임은 화면에서 같은 거리가 되도록 확대한 만큼 줄임
+        snap = max(1, round(engine.EDGE_SNAP * self.scale_ratio / self.view_scale))
+        return engine.snap_crop_box(self.to_source(self.rect_coords), self.original_img.size, snap)
+
     def get_current_crop(self):
-        coords = self.canvas.coords(self.rect_id)
-        x1, y1, x2, y2 = coords[0], coords[1], coords[2], coords[3]
-        rx1 = (x1 - self.safe_margin) / self.scale_ratio
-        ry1 = (y1 - self.safe_margin) / self.scale_ratio
-        rx2 = (x2 - self.safe_margin) / self.scale_ratio
-        ry2 = (y2 - self.safe_margin) / self.scale_ratio
-        rx1, ry1, rx2, ry2 = round(rx1), round(ry1), round(rx2), round(ry2)
-        if rx1 < 10: rx1 = 0
-        if ry1 < 10: ry1 = 0
-        if abs(rx2 - self.original_img.width) < 10: rx2 = self.original_img.width
-        if abs(ry2 - self.original_img.height) < 10: ry2 = self.original_img.height
-        return self.original_img.crop((max(0, rx1), max(0, ry1), min(self.original_img.width, rx2), min(self.original_img.height, ry2)))
+        return self.original_img.crop(self.get_current_box())
 
+    @instrument.traced("show_review")
     def show_review(self):
         self.step = "REVIEW"
         self.canvas.place_forget()
+        self.live_frame.pack_forget()
         self.btn_next.pack_forget()
-        for widget in self.review_frame.winfo_children(): widget.destroy()
         self.review_frame.place(relx=0.5, rely=0.5, anchor="center")
         
         self.root.update_idletasks()
         panel_h = self.work_panel.winfo_height()
         fixed_h = int(panel_h * 0.60) if panel_h > 100 else 400
-        game_cfg = self.configs[self.game_select.get()]
 
-        for label, img in self.crops.items():
+        sizes = {}
+        for label, box in self.crops.items():
+            crop_w, crop_h = engine.box_size(box)
+            p_h = fixed_h
+            p_w = int(p_h * (crop_w/crop_h))
+            if p_h > 0 and p_w > 0: sizes[label] = (p_w, p_h)
+        render_keys = {label: self.render_keys[label][self.is_high_res] for label in sizes}
+        self.jobs.submit("review", "미리보기 만드는 중", self.render_review_previews, self.display_pyramid, self.original_img, self.image_serial, dict(self.crops), sizes, render_keys, on_done=self.build_review)
+
+    @instrument.traced("show_review.render")
+    def render_review_previews(self, job, pyramid, source, serial, boxes, sizes, render_keys):
+        # 작업 스레드: 미리보기 이미지만 만들고 위젯은 build_review 에서 생성
+        # 미리 만든 최종 출력이 미리보기보다 크면 그것을 줄여 쓰고, 작으면 화면 피라미드에서 만듦
+        previews = {}
+        for i, (label, size) in enumerate(sizes.items()):
+            job.report(i, len(sizes))
+            box = boxes[label]
+            final = self.prerender.result(render_keys[label])
+            if final.width >= size[0] and final.height >= size[1]:
+                previews[label] = self.preview_cache.get((serial, box, size, final.size), lambda: final if final.size == size else final.resize(size, Image.LANCZOS))
+            else:
+                previews[label] = self.preview_cache.get((serial, box, size), lambda: pyramid.render_region(box, size, source))
+        return previews
+
+    @instrument.traced("show_review.build")
+    def build_review(self, previews):
+        for widget in self.review_frame.winfo_children(): widget.destroy()
+        for label, box in self.crops.items():
+            if label not in previews: continue
             container = tk.Frame(self.review_frame, bg=self.bg_dark)
             container.pack(side="left", padx=20, anchor="n")
             
-            orig_w, orig_h = img.size
-            base_w, base_h = game_cfg["sizes"][label]
-            ratio = base_w / base_h
-            
-            if self.game_select.get() == "D&D EE (BG1, BG2, IWD1)":
-                max_limit = 1024 if self.is_high_res else (512 if label == "Large" else 118)
-                if orig_h > max_limit:
-                    save_h = max_limit
-                    save_w = round(save_h * ratio)
-                else:
-                    save_w, save_h = orig_w, orig_h
-            else:
-                if "max_h" in game_cfg:
-                    if orig_h > game_cfg["max_h"]:
-                        save_h = game_cfg["max_h"]
-                        save_w = round(save_h * ratio)
-                    else:
-                        save_w, save_h = orig_w, orig_h
-                else:
-                    if orig_w > base_w or orig_h > base_h:
-                        save_w, save_h = base_w, base_h
-                    else:
-                        save_w, save_h = orig_w, orig_h
-            
-            p_h = fixed_h
-            p_w = int(p_h * (orig_w/orig_h))
-            if p_h <= 0 or p_w <= 0: continue
+            orig_w, orig_h = engine.box_size(box)
+            save_w, save_h = engine.output_size(self.game_select.get(), label, (orig_w, orig_h), self.is_high_res)
             
-            p_img = img.resize((p_w, p_h), Image.LANCZOS)
-            tk_p = ImageTk.PhotoImage(p_img)
+            tk_p = ImageTk.PhotoImage(previews[label])
             lbl_img = tk.Label(container, image=tk_p, bg="#000", bd=1, relief="solid")
             lbl_img.image = tk_p
             lbl_img.pack()
@@ -363,7 +758,7 @@ class PortraitMaker:
             tk.Label(container, text=label, fg=self.accent_color, bg=self.bg_dark, font=self.bold_font).pack(pady=(10, 2))
             tk.Label(container, text=f"현재 크기: {int(orig_w)}x{int(orig_h)}", fg=self.text_white, bg=self.bg_dark, font=("Arial", 9)).pack()
             
-            if self.game_select.get() == "D&D EE (BG1, BG2, IWD1)":
+            if self.game_select.get() == engine.EE_GAME:
                 if self.is_high_res:
                     msg, color = f"* {save_w}x{save_h} (고해상도 적용)", self.high_res_color
                 else:
@@ -380,70 +775,120 @@ class PortraitMaker:
 
     def save_portraits(self):
         name = self.char_name_var.get().strip()
-        selected_game = self.game_select.get()
-        cfg = self.configs[selected_game]
-        safe_game_name = re.sub(r'[\\/:*?"<>|]', '', selected_game)
-        save_dir = os.path.join(self.base_dir, safe_game_name)
-        
-        try:
-            if not os.path.exists(save_dir): os.makedirs(save_dir)
-            final_path = os.path.join(save_dir, name) if cfg.get("use_folder") else save_dir
-            if not os.path.exists(final_path): os.makedirs(final_path)
-
-            for label, img in self.crops.items():
-                orig_w, orig_h = img.size
-                base_w, base_h = cfg["sizes"][label]
-                ratio = base_w / base_h
-                
-                if selected_game == "D&D EE (BG1, BG2, IWD1)":
-                    max_limit = 1024 if self.is_high_res else (512 if label == "Large" else 118)
-                    if orig_h > max_limit:
-                        target_h = max_limit
-                        target_w = round(target_h * ratio)
-                        final_img = img.resize((target_w, target_h), Image.LANCZOS)
-                    else:
-                        final_img = img
-                elif "max_h" in cfg:
-                    if orig_h > cfg["max_h"]:
-                        final_h = cfg["max_h"]
-                        final_w = round(final_h * ratio)
-                        final_img = img.resize((final_w, final_h), Image.LANCZOS)
-                    else:
-                        final_img = img
-                else:
-                    if orig_w > base_w or orig_h > base_h:
-                        final_img = img.resize((base_w, base_h), Image.LANCZOS)
-                    else:
-                        final_img = img
-                
-                fn = f"{label}.png" if cfg.get("use_folder") else f"{name}{cfg['suffix'][label]}.{cfg['format'].lower()}"
-                save_full_path = os.path.join(final_path, fn)
-                
-                if cfg["format"] == "PNG": final_img.save(save_full_path, "PNG")
-                else:
-                    if "Classics" in selected_game and label == "Small": final_img.convert("P", palette=Image.ADAPTIVE, colors=256).save(save_full_path, "BMP")
-                    else: final_img.convert("RGB").save(save_full_path, "BMP")
-                    
-            messagebox.showinfo("완료", f"파일명 '{name}'로 저장되었습니다.\n경로: {final_path}")
-        except Exception as e: messagebox.showerror("에러", str(e))
+        if self.all_games_var.get():
+            ready_keys = [key for keys in self.render_keys.values() for key in keys.values()]
+            self.jobs.submit("save", "모든 게임으로 저장 중", self.export_all_games, self.original_img, self.game_select.get(), dict(self.crops), ready_keys, self.base_dir, name, self.is_high_res,
+                             on_done=lambda paths: self.on_saved(f"파일명 '{name}'로 {len(paths)}개 폴더에 저장되었습니다.\n경로: {os.path.commonpath(paths)}"),
+                             on_error=lambda e: messagebox.showerror("에러", str(e)),
+                             on_cancel=lambda: messagebox.showinfo("취소", "저장이 취소되었습니다. 일부 파일은 이미 저장되었을 수 있습니다."))
+            return
+        render_keys = {label: self.render_keys[label][self.is_high_res] for label in self.crops}
+        self.jobs.submit("save", "저장 중", self.write_portraits, render_keys, dict(self.crops), self.base_dir, self.game_select.get(), name, self.is_high_res,
+                         on_done=lambda final_path: self.on_saved(f"파일명 '{name}'로 저장되었습니다.\n경로: {final_path}"),
+                         on_error=lambda e: messagebox.showerror("에러", str(e)),
+                         on_cancel=lambda: messagebox.showinfo("취소", "저장이 취소되었습니다. 일부 파일은 이미 저장되었을 수 있습니다."))
+
+    @instrument.traced("save_portraits")
+    def write_portraits(self, job, render_keys, crops, base_dir, game, name, high_res):
+        # 리샘플링은 자르기 확정 때 끝났으므로 여기서는 인코딩과 쓰기만 함
+        finals = {label: self.prerender.result(key) for label, key in render_keys.items()}
+        sources = {label: (self.source_hash, box, resample.DEFAULT_PRESET) for label, box in crops.items()} if self.source_hash else None
+        final_path = engine.write_portraits(finals, base_dir, game, name, progress=job.report, sources=sources, output_cache=engine.get_output_cache())
+        self.record_manifest({game: crops}, name, high_res, base_dir)
+        return final_path
+
+    @instrument.traced("save_portraits.all_games")
+    def export_all_games(self, job, source, game, crops, ready_keys, base_dir, name, high_res):
+        # 현재 게임의 자르기 영역을 비율이 가장 가까운 것끼리 맞춰 모든 게임에 저장
+        # 같은 (영역, 크기) 축소는 한 번만 하며, 미리 만든 결과가 있으면 그대로 씀
+        plan = engine.plan_exports(list(crops.values()), source.size, high_res=high_res, fixed={(game, label): box for label, box in crops.items()})
+        ready = {(key[1], key[2]): self.prerender.result(key) for key in ready_keys if (key[1], key[2]) in plan}
+        paths = engine.export_plan(source, plan, base_dir, name, progress=job.report, ready=ready, source_hash=self.source_hash, output_cache=engine.get_output_cache())
+        self.record_manifest(manifest.plan_crops(plan), name, high_res, base_dir)
+        return paths
+
+    def record_manifest(self, crops, name=None, high_res=None, base_dir=None):
+        # 원본 옆에 자르기 기록 저장. 원본 폴더에 쓸 수 없으면 기록 없이 진행
+        if not self.source_path: return None
+        name = name if name is not None else self.char_name_var.get().strip()
+        try: return manifest.record(self.source_path, self.source_hash, self.original_img.size, name, crops, self.is_high_res if high_res is None else high_res, base_dir=base_dir)
+        except OSError: return None
+
+    def on_saved(self, message):
+        # 대기열에 남은 이미지가 있으면 저장 후 바로 다음 이미지로 넘어감
+        if self.queue_idx + 1 < len(self.queue):
+            messagebox.showinfo("완료", f"{message}\n\n다음 이미지({self.queue_idx + 2}/{len(self.queue)})로 넘어갑니다.")
+            self.next_image()
+        else: messagebox.showinfo("완료", message)
+
+    def cancel_save(self):
+        self.jobs.cancel("save")
+        self.update_job_ui()
+
+    def update_job_ui(self):
+        # 실행 중인 작업과 겹치는 버튼만 잠그고, 끝나면 원래 상태로 되돌림
+        wanted = {name for kind in self.jobs.jobs for name in self.job_locks[kind]}
+        for name in {n for names in self.job_locks.values() for n in names}:
+            widget = getattr(self, name)
+            if name in wanted and name not in self.locked_states:
+                self.locked_states[name] = str(widget.cget("state"))
+                widget.config(state="disabled")
+            elif name not in wanted and name in self.locked_states:
+                widget.config(state=self.locked_states.pop(name))
+
+        job = self.jobs.current()
+        # 금방 끝나는 작업은 진행 표시 없이 처리
+        if not job or time.monotonic() - job.started < 0.2:
+            if not job: self.job_frame.pack_forget()
+            return
+        done, total = job.progress
+        self.job_label.config(text="취소하는 중..." if job.cancelled else f"{job.title} ({done}/{total})" if total else job.title)
+        self.job_progress.config(maximum=max(total, 1), value=done)
+        if job.kind == "save":
+            self.btn_cancel.config(state="disabled" if job.cancelled else "normal")
+            if not self.btn_cancel.winfo_manager(): self.btn_cancel.pack(fill="x", ipady=4)
+        else: self.btn_cancel.pack_forget()
+        if not self.job_frame.winfo_manager(): self.job_frame.pack(fill="x", pady=(20, 0), after=self.btn_load)
+
+    def on_close(self):
+        for service in (self.jobs, self.prerender, self.prefetch):
+            if service: service.shutdown()
+        self.root.destroy()
 
     def on_drag(self, event):
+        # 위치만 기억하고, 한 프레임 안에 들어온 이벤트는 모아서 마지막 위치로 한 번만 처리
         if self.step != "CROPPING": return
-        x1, y1, x2, y2 = self.canvas.coords(self.rect_id)
-        min_x, min_y = self.safe_margin, self.safe_margin + self.frame_padding
-        max_x, max_y = self.display_img.width + self.safe_margin - 1, self.display_img.height + self.safe_margin - self.frame_padding - 2
+        self.drag_pos = (event.x, event.y)
+        if not self.drag_job: self.drag_job = self.root.after(self.drag_delay, self.apply_drag)
+
+    def flush_drag(self, event=None):
+        # 버튼을 놓거나 다음 단계로 넘어갈 때 남은 드래그를 바로 반영
+        if self.drag_job:
+            self.root.after_cancel(self.drag_job)
+            self.apply_drag()
+
+    def cancel_drag(self):
+        if self.drag_job: self.root.after_cancel(self.drag_job)
+        self.drag_job = self.drag_pos = None
+
+    @instrument.traced("on_drag")
+    def apply_drag(self):
+        self.drag_job = None
+        if self.step != "CROPPING" or not self.drag_pos: return
+        ex, ey = self.drag_pos
+        x1, y1, x2, y2 = self.rect_coords
+        min_x, min_y, max_x, max_y = self.drag_bounds
         if self.mode == 'move':
-            dx, dy = event.x - self.start_x, event.y - self.start_y
+            dx, dy = ex - self.start_x, ey - self.start_y
             if x1 + dx < min_x: dx = min_x - x1
             if x2 + dx > max_x: dx = max_x - x2
             if y1 + dy < min_y: dy = min_y - y1
             if y2 + dy > max_y: dy = max_y - y2
-            self.canvas.move(self.rect_id, dx, dy)
-            self.start_x, self.start_y = event.x, event.y
+            self.set_rect(x1 + dx, y1 + dy, x2 + dx, y2 + dy)
+            self.start_x, self.start_y = ex, ey
         elif self.mode.startswith('resize'):
-            target_size = self.configs[self.game_select.get()]["sizes"][self.current_steps[self.step_idx]]
-            ratio = target_size[1] / target_size[0]
-            cx, cy = event.x, event.y
+            ratio = self.drag_ratio
+            cx, cy = ex, ey
             if cx > max_x - 8: cx = max_x
             if cx < min_x + 8: cx = min_x
             cur_nx1, cur_ny1, cur_nx2, cur_ny2 = x1, y1, x2, y2
@@ -483,53 +928,69 @@ class PortraitMaker:
             if cur_ny1 + final_h > max_y:
                 final_h = max_y - cur_ny1
                 final_w = final_h / ratio
-            if 'top' in self.mode: self.canvas.coords(self.rect_id, x1, y2 - final_h, x1 + final_w, y2)
-            elif 'bottom' in self.mode: self.canvas.coords(self.rect_id, x1, y1, x1 + final_w, y1 + final_h)
-            elif 'right' in self.mode: self.canvas.coords(self.rect_id, x1, y1, x1 + final_w, y1 + final_h)
-            elif 'left' in self.mode: self.canvas.coords(self.rect_id, x2 - final_w, y1, x2, y1 + final_h)
+            if 'top' in self.mode: self.set_rect(x1, y2 - final_h, x1 + final_w, y2)
+            elif 'bottom' in self.mode: self.set_rect(x1, y1, x1 + final_w, y1 + final_h)
+            elif 'right' in self.mode: self.set_rect(x1, y1, x1 + final_w, y1 + final_h)
+            elif 'left' in self.mode: self.set_rect(x2 - final_w, y1, x2, y1 + final_h)
+        self.update_live_preview()
 
     def on_click(self, event):
-        if self.step != "CROPPING": return
+        if self.step != "CROPPING" or not self.rect_coords: return
+        self.flush_drag()
         self.start_x, self.start_y = event.x, event.y
-        try:
-            coords = self.canvas.coords(self.rect_id)
-            x1, y1, x2, y2 = coords[0], coords[1], coords[2], coords[3]
-            margin = 15
-            self.mode = 'move'
-            if abs(event.y - y1) < margin: self.mode = 'resize_top'
-            elif abs(event.y - y2) < margin: self.mode = 'resize_bottom'
-            elif abs(event.x - x1) < margin: self.mode = 'resize_left'
-            elif abs(event.x - x2) < margin: self.mode = 'resize_right'
-            else: self.mode = 'move'
-        except: pass
+        x1, y1, x2, y2 = self.rect_coords
+        margin = 15
+        if abs(event.y - y1) < margin: self.mode = 'resize_top'
+        elif abs(event.y - y2) < margin: self.mode = 'resize_bottom'
+        elif abs(event.x - x1) < margin: self.mode = 'resize_left'
+        elif abs(event.x - x2) < margin: self.mode = 'resize_right'
+        else: self.mode = 'move'
 
     def update_cursor(self, event):
-        if self.step != "CROPPING": return
-        try:
-            coords = self.canvas.coords(self.rect_id)
-            x1, y1, x2, y2 = coords[0], coords[1], coords[2], coords[3]
-            margin = 15
-            if abs(event.y - y1) < margin or abs(event.y - y2) < margin: self.canvas.config(cursor="sb_v_double_arrow")
-            elif abs(event.x - x1) < margin or abs(event.x - x2) < margin: self.canvas.config(cursor="sb_h_double_arrow")
-            else: self.canvas.config(cursor="fleur")
-        except: pass
+        # 버튼을 누르지 않은 마우스 이동마다 불리므로 캔버스에 묻지 않고 기억해 둔 좌표로 판단
+        if self.step != "CROPPING" or not self.rect_coords: return
+        x1, y1, x2, y2 = self.rect_coords
+        margin = 15
+        if abs(event.y - y1) < margin or abs(event.y - y2) < margin: cursor = "sb_v_double_arrow"
+        elif abs(event.x - x1) < margin or abs(event.x - x2) < margin: cursor = "sb_h_double_arrow"
+        else: cursor = "fleur"
+        if cursor != self.canvas_cursor:
+            self.canvas_cursor = cursor
+            self.canvas.config(cursor=cursor)
 
     def on_window_resize(self, event):
         if not self.original_img: return
+        # 드래그 중 연속으로 들어오는 이벤트는 모아서 마지막 크기만 그림
+        if self.resize_job: self.root.after_cancel(self.resize_job)
+        self.resize_job = self.root.after(self.resize_delay, self.apply_window_resize)
+
+    def apply_window_resize(self):
+        self.resize_job = None
         curr_w, curr_h = self.root.winfo_width(), self.root.winfo_height()
         if abs(curr_w - self.last_width) > 5 or abs(curr_h - self.last_height) > 5:
             self.last_width, self.last_height = curr_w, curr_h
             if self.step == "CROPPING":
+                norm_box = self.get_norm_box()
                 self.refresh_display_size()
-                self.init_crop_frame()
+                self.init_crop_frame(norm_box)
             elif self.step == "REVIEW": self.show_review()
             
     def limit_char_name(self, *args):
         value = self.char_name_var.get()
-        v = re.sub(r'[^a-zA-Z0-9]', '', value)[:15]
+        v = engine.sanitize_char_name(value)
         if value != v: self.char_name_var.set(v)
 
 if __name__ == "__main__":
-    root = TkinterDnD.Tk()
+    if getattr(sys, 'frozen', False):
+        # 묶음 실행 파일에서 작업 프로세스로 실행된 경우 (multiprocessing 은 이때만 불러옴)
+        import multiprocessing
+        multiprocessing.freeze_support()
+    base_dir = os.path.dirname(sys.executable) if getattr(sys, 'frozen', False) else os.path.dirname(os.path.abspath(__file__))
+    # --trace / --profile (또는 PORTRAITS_TRACE / PORTRAITS_PROFILE) 로 단계별 기록을 켬
+    argv = instrument.configure(sys.argv[1:], os.path.join(base_dir, "logs"))
+    if argv:
+        from portraits import cli
+        sys.exit(cli.main(argv))
+    root = Root()
     app = PortraitMaker(root)
     root.mainloop()
\ No newline at end of file
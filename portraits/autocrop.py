@@ -0,0 +1,184 @@
+import math
+import time
+
+from PIL import Image, ImageDraw, ImageFilter
+
+# 자동 자르기 영역 추천
+# 작은 이미지(긴 변 ANALYSIS_SIDE) 에서 색 대비 saliency 와 밝기 경계(edge) 에너지 지도를 만들고
+# 적분 영상으로 목표 비율의 모든 후보 영역(크기 × 위치) 점수를 한 번에 계산함
+# numpy 가 없으면 중앙 기본 영역만 돌려줌. numpy 는 처음 분석할 때 불러옴 (import 만 100ms 가량)
+
+ANALYSIS_SIDE = 256
+SCALES = 10
+MIN_SCALE = 0.35
+STRIDE = 3
+# 점수 = 담긴 에너지 비율 - AREA_PENALTY × 면적 비율
+AREA_PENALTY = 0.5
+NMS_IOU = 0.5
+
+np = None
+_np_checked = False
+
+def available():
+    global np, _np_checked
+    if not _np_checked:
+        try:
+            import numpy
+            np = numpy
+        except ImportError:
+            pass
+        _np_checked = True
+    return np is not None
+
+def center_box(img_w, img_h, target_size):
+    # engine 이 이 모듈을 불러오므로 여기서 불러옴
+    from portraits import engine
+    return engine.default_crop_box(img_w, img_h, target_size)
+
+def iou(a, b):
+    w = min(a[2], b[2]) - max(a[0], b[0])
+    h = min(a[3], b[3]) - max(a[1], b[1])
+    if w <= 0 or h <= 0: return 0.0
+    inter = w * h
+    return inter / ((a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter)
+
+class CropProposer:
+    # img 는 화면 피라미드의 작은 단계 등 축소본, source_size 는 원본 크기. 돌려주는 영역은 원본 좌표
+    def __init__(self, img, source_size=None):
+        self.source_size = tuple(source_size or img.size)
+        scale = min(1.0, ANALYSIS_SIDE / max(img.size))
+        small = img if scale == 1.0 else img.resize((max(1, round(img.width * scale)), max(1, round(img.height * scale))), Image.BILINEAR)
+        self.size = small.size
+        self.integral = self._energy_integral(small) if available() else None
+
+    @classmethod
+    def from_pyramid(cls, pyramid):
+        return cls(pyramid.levels[-1], pyramid.source_size)
+
+    @classmethod
+    def from_image(cls, img):
+        # 일괄 처리용: 이미 디코딩한 원본을 정수 배 축소(reduce) 로 먼저 줄여서 분석
+        factor = max(1, min(img.size) // (ANALYSIS_SIDE * 2))
+        if img.mode not in ("RGB", "RGBA", "L"): img = img.convert("RGB")
+        return cls(img.reduce(factor) if factor > 1 else img, img.size)
+
+    @classmethod
+    def from_path(cls, path):
+        # 일괄 처리용: JPEG 는 1/8 크기로 바로 읽어서 전체 디코딩 없이 분석 (다른 형식은 from_image)
+        with Image.open(path) as img:
+            source_size = img.size
+            img.draft("RGB", (ANALYSIS_SIDE * 2, ANALYSIS_SIDE * 2))
+            return cls(img.convert("RGB"), source_size)
+
+    @staticmethod
+    def _energy_integral(small):
+        ycc = np.asarray(small.convert("RGB").filter(ImageFilter.GaussianBlur(1.5)).convert("YCbCr"), dtype=np.float32)
+        # saliency: 흐린 색이 이미지 평균색에서 얼마나 먼지
+        saliency = np.sqrt(((ycc - ycc.reshape(-1, 3).mean(axis=0)) ** 2).sum(axis=2))
+        # edge: 밝기 기울기 크기
+        y = ycc[..., 0]
+        edge = np.zeros_like(y)
+        edge[:, 1:] += np.abs(np.diff(y, axis=1))
+        edge[1:, :] += np.abs(np.diff(y, axis=0))
+        energy = saliency / (saliency.mean() + 1e-6) + edge / (edge.mean() + 1e-6)
+        # 가로 중앙을 약간 선호 (점수가 같을 때 가장자리보다 중앙)
+        h, w = energy.shape
+        xs = (np.arange(w, dtype=np.float32) - (w - 1) / 2) / max(w, 1)
+        energy *= (0.7 + 0.3 * np.exp(-(xs ** 2) / 0.08))[None, :]
+        integral = np.zeros((h + 1, w + 1), dtype=np.float64)
+        integral[1:, 1:] = energy.cumsum(axis=0).cumsum(axis=1)
+        return integral
+
+    def _fallback(self, target_size):
+        return [center_box(self.source_size[0], self.source_size[1], target_size)]
+
+    def propose(self, target_size, top_k=3):
+        # target_size 비율의 추천 영역을 점수 순으로 최대 top_k 개 (원본 좌표)
+        if self.integral is None: return self._fallback(target_size)
+        W, H = self.size
+        sw, sh = self.source_size
+        # 분석 이미지의 화소가 정사각형이 아닐 수 있으므로 원본 비율로 환산
+        ratio = target_size[0] / target_size[1] * (W / sw) / (H / sh)
+        max_w, max_h = (H * ratio, H) if W / H > ratio else (W, W / ratio)
+        I = self.integral
+        total = I[-1, -1]
+        if total <= 0: return self._fallback(target_size)
+        boxes, scores = [], []
+        for s in np.linspace(MIN_SCALE, 1.0, SCALES):
+            bw, bh = max(1, int(max_w * s)), max(1, int(max_h * s))
+            xs = np.arange(0, W - bw + 1, STRIDE)
+            ys = np.arange(0, H - bh + 1, STRIDE)
+            if not len(xs) or not len(ys): continue
+            x1, y1 = xs[None, :], ys[:, None]
+            energy = I[y1 + bh, x1 + bw] - I[y1, x1 + bw] - I[y1 + bh, x1] + I[y1, x1]
+            score = energy / total - AREA_PENALTY * (bw * bh) / (W * H)
+            flat = score.ravel()
+            # 크기마다 상위 몇 개만 남겨 NMS 대상을 줄임
+            keep = np.argpartition(-flat, min(top_k * 4, flat.size - 1))[:top_k * 4]
+            for k in keep:
+                yi, xi = divmod(int(k), len(xs))
+                boxes.append((int(xs[xi]), int(ys[yi]), int(xs[xi]) + bw, int(ys[yi]) + bh))
+                scores.append(float(flat[k]))
+        ranked = []
+        for i in sorted(range(len(boxes)), key=lambda i: -scores[i]):
+            if all(iou(boxes[i], b) < NMS_IOU for b in ranked): ranked.append(boxes[i])
+            if len(ranked) >= top_k: break
+        fx, fy = sw / W, sh / H
+        return [(x1 * fx, y1 * fy, x2 * fx, y2 * fy) for x1, y1, x2, y2 in ranked] or self._fallback(target_size)
+
+    def best(self, target_size):
+        return self.propose(target_size, 1)[0]
+
+    def propose_steps(self, config, top_k=3):
+        # 게임 설정(engine.GAME_CONFIGS 의 항목) 의 단계별 추천 영역
+        return {label: self.propose(config["sizes"][label], top_k) for label in config["steps"]}
+
+# --- 벤치마크 ---
+def make_fixture(seed, size=(1600, 1200)):
+    # 잔무늬 배경 위에 머리/몸 모양의 눈에 띄는 인물을 무작위 위치에 그린 이미지와 인물 영역
+    import random
+    rnd = random.Random(seed)
+    noise = Image.effect_noise((size[0] // 16, size[1] // 16), 20).resize(size, Image.BILINEAR)
+    img = Image.merge("RGB", (noise, noise, noise)).point(lambda v: v // 2 + 40)
+    draw = ImageDraw.Draw(img)
+    fw = rnd.randint(size[0] // 6, size[0] // 3)
+    fh = int(fw * rnd.uniform(1.5, 2.2))
+    fh = min(fh, size[1] - 20)
+    x = rnd.randint(10, size[0] - fw - 10)
+    y = rnd.randint(10, size[1] - fh - 10)
+    color = tuple(rnd.randint(120, 255) for _ in range(3))
+    head = fw * 0.6
+    draw.ellipse((x + (fw - head) / 2, y, x + (fw + head) / 2, y + head), fill=color)
+    draw.rectangle((x, y + head, x + fw, y + fh), fill=tuple(c // 2 + 60 for c in color))
+    return img, (x, y, x + fw, y + fh)
+
+def coverage(box, target):
+    # 인물 영역 중 추천 영역에 들어온 비율
+    w = min(box[2], target[2]) - max(box[0], target[0])
+    h = min(box[3], target[3]) - max(box[1], target[1])
+    if w <= 0 or h <= 0: return 0.0
+    return w * h / ((target[2] - target[0]) * (target[3] - target[1]))
+
+def benchmark(configs, images=None, count=20):
+    # images 가 없으면 합성 이미지 count 장. 이미지마다 분석 + 모든 게임/단계 추천에 걸린 시간과
+    # (합성 이미지일 때) 인물 영역이 추천 영역에 담긴 비율을 중앙 기본 영역과 비교
+    fixtures = [(img, None) for img in images] if images else [make_fixture(i) for i in range(count)]
+    times, auto_cov, center_cov = [], [], []
+    for img, target in fixtures:
+        small = img.copy()
+        small.thumbnail((ANALYSIS_SIDE * 2, ANALYSIS_SIDE * 2))
+        t = time.perf_counter()
+        proposer = CropProposer(small, img.size)
+        for cfg in configs.values(): proposer.propose_steps(cfg)
+        times.append(time.perf_counter() - t)
+        if target:
+            for cfg in configs.values():
+                for label in cfg["steps"]:
+                    auto_cov.append(coverage(proposer.best(cfg["sizes"][label]), target))
+                    center_cov.append(coverage(center_box(img.width, img.height, cfg["sizes"][label]), target))
+    times.sort()
+    result = {"images": len(times), "avg_ms": sum(times) / len(times) * 1000, "p95_ms": times[min(len(times) - 1, math.ceil(len(times) * 0.95) - 1)] * 1000}
+    if auto_cov:
+        result["coverage_auto"] = sum(auto_cov) / len(auto_cov)
+        result["coverage_center"] = sum(center_cov) / len(center_cov)
+    return result
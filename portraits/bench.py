@@ -0,0 +1,304 @@
+import json
+import math
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import PIL
+
+from portraits import engine
+from portraits.memcheck import make_source
+
+# PortraitMaker 의 실제 메서드를 가짜 Tk 위젯 위에서 호출해 단계별 시간을 잼.
+# 화면(DISPLAY, Xvfb 포함)이 있으면 ImageTk.PhotoImage 변환까지 실제로 수행함
+
+FORMATS = {"jpeg": ".jpg", "png": ".png", "webp": ".webp"}
+DEFAULT_MEGAPIXELS = (1, 12, 40)
+PANEL_SIZE = (1500, 1000)
+DRAG_FRAMES = 30
+# 출력 크기보다 작은 원본 (자르기 영역이 줄어들지 않아 출력 크기가 영역 크기 그대로인 경우)
+SMALL_SOURCE = (120, 160)
+SCREEN_SIZE = (1920, 1080)
+
+class FakeWidget:
+    def __init__(self, **values):
+        self.values = values
+
+    def get(self): return self.values["value"]
+    def set(self, value): self.values["value"] = value
+    def winfo_width(self): return self.values["width"]
+    def winfo_height(self): return self.values["height"]
+    def winfo_screenwidth(self): return SCREEN_SIZE[0]
+    def winfo_screenheight(self): return SCREEN_SIZE[1]
+    def update_idletasks(self): pass
+    def config(self, **kw): pass
+    def winfo_manager(self): return ""
+    def winfo_children(self): return []
+    def pack(self, **kw): pass
+    def pack_forget(self): pass
+    def place(self, **kw): pass
+    def place_forget(self): pass
+    def destroy(self): pass
+    def after(self, ms, fn, *args): return "after"
+    def after_cancel(self, job): pass
+
+class FakeCanvas(FakeWidget):
+    def __init__(self):
+        super().__init__()
+        self.items = {}
+
+    def delete(self, tag): self.items.clear()
+    def tag_lower(self, tag): pass
+    def coords(self, item, *args):
+        if args: self.items[item] = args
+        return list(self.items[item])
+
+    def create_image(self, *args, **kw):
+        self.items[len(self.items) + 1] = args
+        return len(self.items)
+
+    def create_rectangle(self, x1, y1, x2, y2, **kw):
+        self.items[len(self.items) + 1] = (x1, y1, x2, y2)
+        return len(self.items)
+
+class FakeJob:
+    cancelled = False
+    def report(self, done, total): pass
+
+def load_app_class():
+    main = sys.modules.get("__main__")
+    if not hasattr(main, "PortraitMaker"):
+        import main
+    # main 은 Pillow 와 처리 모듈을 창을 띄운 뒤에 불러오므로 여기서 불러 둠
+    main.load_modules()
+    return main
+
+def make_app(main, out_dir):
+    # __init__ (위젯 생성) 을 건너뛰고 벤치마크와 memcheck 에 필요한 상태만 채움. 다 쓰면 app.on_close()
+    from portraits import jobs, prefetch, prerender, preview
+    app = main.PortraitMaker.__new__(main.PortraitMaker)
+    app.root = FakeWidget()
+    app.work_panel = FakeWidget(width=PANEL_SIZE[0], height=PANEL_SIZE[1])
+    app.canvas = FakeCanvas()
+    app.game_select = FakeWidget(value=None)
+    app.char_name_var = FakeWidget(value="")
+    app.frame_color_var = FakeWidget(value="#ffffff")
+    app.configs = engine.GAME_CONFIGS
+    app.base_dir = out_dir
+    app.safe_margin, app.rect_width, app.scale_ratio = 21, 1, 1.0
+    app.frame_padding, app.min_size, app.live_max_h = 1, 40, 160
+    app.live_frame, app.live_label, app.live_caption, app.bottom_btn_frame = FakeWidget(), FakeWidget(), FakeWidget(), FakeWidget()
+    app.review_frame, app.status_label, app.btn_next, app.btn_save, app.btn_retry = FakeWidget(), FakeWidget(), FakeWidget(), FakeWidget(), FakeWidget()
+    app.queue_frame, app.queue_label, app.btn_next_image = FakeWidget(), FakeWidget(), FakeWidget()
+    app.accent_color, app.btn_disabled_bg, app.text_white = "#ffc107", "#333a45", "#ffffff"
+    app.drag_job = app.drag_pos = None
+    app.drag_delay = 16
+    app.zoom_level, app.view_scale, app.view_origin = 0, 1.0, (0.0, 0.0)
+    app.tiles, app.view_photos, app.bg_dark = None, {}, "#1e1e1e"
+    app.pan_job = app.pan_pos = app.pan_applied = None
+    app.step = "CROPPING"
+    app.preview_cache = preview.PreviewCache()
+    app.prerender = prerender.Prerenderer()
+    app.jobs = jobs.JobRunner(app.root)
+    app.prefetch = prefetch.Prefetcher(ahead=0)
+    app.queue, app.queue_idx, app.queue_names = [], 0, []
+    app.image_serial = 0
+    app.original_img = app.display_pyramid = app.display_img = None
+    app.source_path = app.source_hash = app.manifest = app.proposer = None
+    app.proposals = []
+    app.is_high_res = False
+    return app
+
+def use_real_photoimage():
+    # 화면이 없으면 PhotoImage 변환은 건너뜀
+    if sys.platform.startswith("linux") and not os.environ.get("DISPLAY"): return None
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+        root.withdraw()
+        return root
+    except Exception:
+        return None
+
+def timed(fn, repeat, setup=None):
+    best = float("inf")
+    for _ in range(repeat):
+        if setup: setup()
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best
+
+def drag(app):
+    # 오른쪽 아래 모서리를 끌어 영역을 줄였다가 키우는 드래그. 한 프레임에 모인 이벤트 처리 + 실제 크기 미리보기
+    x1, y1, x2, y2 = app.rect_coords
+    app.mode = "resize_right"
+    for i in range(DRAG_FRAMES):
+        app.drag_pos = (x2 - (x2 - x1) * 0.4 * math.sin(math.pi * i / DRAG_FRAMES), y2)
+        app.apply_drag()
+
+def bench_zoom(app, repeat):
+    # 원본 1:1 배율로 확대(빈 타일 캐시) 와, 확대한 채 화면을 옮길 때 한 프레임에 걸리는 시간
+    from portraits import viewport
+    level = next((n for n in range(viewport.max_zoom_level(app.scale_ratio) + 1) if viewport.zoom_scale(app.scale_ratio, n) >= 1.0), 0)
+    center = [s / 2 for s in app.original_img.size]
+
+    def zoom_in():
+        app.set_view(level, center)
+        app.draw_view()
+
+    def zoom_out():
+        app.set_view(0)
+        app.draw_view()
+        app.tiles.clear()
+
+    app.tiles.rendered = 0
+    zoom_t = timed(zoom_in, repeat, zoom_out)
+
+    def pan():
+        for i in range(DRAG_FRAMES):
+            x = center[0] + viewport.TILE * 2 * math.sin(math.pi * i / DRAG_FRAMES) / app.view_scale
+            app.set_view(level, (x, center[1]))
+            app.draw_view()
+
+    # 매번 처음 확대한 화면에서 시작해 새로 보이는 타일도 만들게 함
+    pan_t = timed(pan, repeat, lambda: (zoom_out(), zoom_in())) / DRAG_FRAMES
+    rendered = app.tiles.rendered
+    zoom_out()
+    app.tiles.rendered = rendered
+    return {"zoom_in": zoom_t, "pan_frame": pan_t}
+
+def check_small_image(main, app, path):
+    # 작은 원본을 불러와 모든 게임/단계의 자르기 화면(실제 크기 미리보기 포함) 과 드래그가 되는지 확인. 실패하면 예외
+    from PIL import Image
+    Image.new("RGB", SMALL_SOURCE, "gray").save(path)
+    app.original_img, app.display_pyramid = main.PortraitMaker.decode_image(FakeJob(), path, SCREEN_SIZE)[:2]
+    app.image_serial += 1
+    app.tiles = app.display_img = None
+    try:
+        app.refresh_display_size()
+        for game, cfg in app.configs.items():
+            app.game_select.values["value"] = game
+            app.current_steps, app.crops, app.render_keys = cfg["steps"], {}, {}
+            for app.step_idx, label in enumerate(cfg["steps"]):
+                app.init_crop_frame()
+                drag(app)
+    finally:
+        app.original_img.close()
+        app.display_pyramid.close()
+
+def clear_palettes():
+    # 저장 시간에 256색 팔레트 계산이 매번 들어가도록 팔레트 캐시(메모리와 디스크) 를 비움
+    quantizer = engine.get_quantizer()
+    quantizer.palettes.clear()
+    shutil.rmtree(quantizer.cache_dir, ignore_errors=True)
+
+def bench_input(main, app, path, repeat, log):
+    results = {}
+    max_size = (app.root.winfo_screenwidth(), app.root.winfo_screenheight())
+    results["decode"] = timed(lambda: main.PortraitMaker.decode_image(FakeJob(), path, max_size), repeat)
+    app.original_img, app.display_pyramid = main.PortraitMaker.decode_image(FakeJob(), path, max_size)[:2]
+    app.image_serial += 1
+    app.tiles = app.display_img = None
+    results["refresh_display_size"] = timed(app.refresh_display_size, repeat, app.preview_cache.clear)
+    results["refresh_display_size_cached"] = timed(app.refresh_display_size, repeat)
+    log(f"  decode {results['decode'] * 1000:.1f} ms, refresh_display_size {results['refresh_display_size'] * 1000:.1f} ms")
+    results.update(bench_zoom(app, repeat))
+    log(f"  zoom 100% {results['zoom_in'] * 1000:.1f} ms, pan {results['pan_frame'] * 1000:.1f} ms/frame (타일 {app.tiles.rendered}개 만듦)")
+
+    for game, cfg in app.configs.items():
+        app.game_select.values["value"] = game
+        app.current_steps, app.crops, app.render_keys = cfg["steps"], {}, {}
+        crop_t = drag_t = 0.0
+        for app.step_idx, label in enumerate(cfg["steps"]):
+            app.init_crop_frame()
+            drag_t += timed(lambda: drag(app), repeat, lambda: app.init_crop_frame()) / DRAG_FRAMES
+            app.init_crop_frame()
+            crop_t += timed(app.get_current_crop, repeat)
+            app.crops[label] = app.get_current_box()
+
+        def review():
+            app.prerender.clear()
+            app.preview_cache.clear()
+            for label in app.crops: app.request_renders(label)
+            sizes = {label: (int(600 * engine.box_size(box)[0] / engine.box_size(box)[1]), 600) for label, box in app.crops.items()}
+            keys = {label: app.render_keys[label][app.is_high_res] for label in sizes}
+            previews = app.render_review_previews(FakeJob(), app.display_pyramid, app.original_img, app.image_serial, dict(app.crops), sizes, keys)
+            for img in previews.values(): main.ImageTk.PhotoImage(img)
+
+        review_t = timed(review, repeat)
+        keys = {label: app.render_keys[label][app.is_high_res] for label in app.crops}
+        save_t = timed(lambda: app.write_portraits(FakeJob(), keys, dict(app.crops), app.base_dir, game, "BENCH", app.is_high_res), repeat, clear_palettes)
+        key = engine.safe_game_name(game)
+        results[f"{key}/get_current_crop"] = crop_t
+        results[f"{key}/drag_frame"] = drag_t
+        results[f"{key}/review"] = review_t
+        results[f"{key}/save"] = save_t
+        log(f"  {game}: drag {drag_t * 1000:.2f} ms/frame, crop {crop_t * 1000:.1f} ms, review {review_t * 1000:.1f} ms, save {save_t * 1000:.1f} ms")
+    app.original_img.close()
+    app.display_pyramid.close()
+    return results
+
+def run(megapixels=DEFAULT_MEGAPIXELS, formats=tuple(FORMATS), repeat=3, log=print):
+    main = load_app_class()
+    tk_root = use_real_photoimage()
+    if tk_root is None:
+        main.ImageTk = type("FakeImageTk", (), {"PhotoImage": staticmethod(lambda img: img)})
+    results = {}
+    cache_dir = os.environ.get("PORTRAITS_CACHE_DIR")
+    with tempfile.TemporaryDirectory() as tmp:
+        # 합성 원본은 별도 프로세스에서 미리 만들어 둠
+        jobs = [(fmt, mp, os.path.join(tmp, f"{fmt}-{mp:g}mp{FORMATS[fmt]}")) for mp in megapixels for fmt in formats]
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            list(pool.map(make_source, [j[2] for j in jobs], [j[1] for j in jobs], range(len(jobs))))
+        app = make_app(main, os.path.join(tmp, "out"))
+        try:
+            # 팔레트/출력 캐시는 사용자 캐시 폴더 대신 임시 폴더에 둠 (이전 실행 결과에 따라 측정값이 달라지지 않게)
+            os.environ["PORTRAITS_CACHE_DIR"] = os.path.join(tmp, "cache")
+            check_small_image(main, app, os.path.join(tmp, "small.png"))
+            log(f"작은 원본 {SMALL_SOURCE[0]}x{SMALL_SOURCE[1]}: 모든 게임/단계 자르기 화면 확인")
+            for fmt, mp, path in jobs:
+                log(f"[{fmt} {mp:g} MP]")
+                for name, sec in bench_input(main, app, path, repeat, log).items():
+                    results[f"{fmt}-{mp:g}mp/{name}"] = sec
+        finally:
+            app.on_close()
+            if tk_root: tk_root.destroy()
+            if cache_dir is None: os.environ.pop("PORTRAITS_CACHE_DIR", None)
+            else: os.environ["PORTRAITS_CACHE_DIR"] = cache_dir
+    return {
+        "meta": {
+            "python": platform.python_version(), "pillow": PIL.__version__, "platform": platform.platform(),
+            "photoimage": tk_root is not None, "repeat": repeat, "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+def compare(baseline, current, threshold=0.15, min_delta=0.002):
+    # threshold 비율 이상, min_delta 초 이상 느려진 항목을 회귀로 봄
+    rows = []
+    for key, cur in sorted(current["results"].items()):
+        base = baseline["results"].get(key)
+        if base is None: continue
+        ratio = cur / base if base else float("inf")
+        rows.append({"key": key, "baseline": base, "current": cur, "ratio": ratio,
+                     "regression": ratio > 1 + threshold and cur - base > min_delta})
+    return rows
+
+def print_comparison(rows, log=print):
+    for row in rows:
+        mark = "회귀" if row["regression"] else ""
+        log(f"{row['key']:<60} {row['baseline'] * 1000:9.1f} -> {row['current'] * 1000:9.1f} ms  x{row['ratio']:.2f} {mark}")
+    regressions = [r for r in rows if r["regression"]]
+    log(f"비교 {len(rows)}개 항목, 회귀 {len(regressions)}개")
+    return regressions
+
+def load(path):
+    with open(path, encoding="utf-8") as f: return json.load(f)
+
+def save(data, path):
+    with open(path, "w", encoding="utf-8") as f: json.dump(data, f, indent=2, ensure_ascii=False)
@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+# 저장한 초상화 파일을 (원본 해시, 자르기 영역, 출력 크기, 품질 설정, 형식/팔레트 설정) 키로 보관하는 디스크 캐시
+# 같은 출력을 다시 저장할 때는 리샘플링/인코딩 없이 파일을 복사(또는 하드 링크)함
+# 출력을 만들 때 쓴 작은 값(자동 자르기 영역 등) 도 JSON 으로 보관해서, 모든 출력이 캐시에 있으면 원본을 열지 않아도 되게 함
+# 전체 크기가 max_bytes 를 넘으면 가장 오래 쓰지 않은 파일부터 지움 (파일 수정 시각 기준)
+
+DEFAULT_CACHE_MB = 512
+
+def cache_budget():
+    # PORTRAITS_OUTPUT_CACHE_MB 환경 변수로 조절 (MB)
+    try: return int(float(os.environ.get("PORTRAITS_OUTPUT_CACHE_MB", DEFAULT_CACHE_MB)) * 1024 * 1024)
+    except ValueError: return DEFAULT_CACHE_MB * 1024 * 1024
+
+def make_key(*parts):
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, default=list).encode()).hexdigest()
+
+class OutputCache:
+    def __init__(self, cache_dir, max_bytes=None, link=False):
+        # link: 복사 대신 하드 링크 (게임 폴더의 파일을 직접 고치면 캐시도 바뀌므로 기본은 복사)
+        self.cache_dir = cache_dir
+        self.max_bytes = cache_budget() if max_bytes is None else max_bytes
+        self.link = link
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+        self.total = None
+
+    def _path(self, key, ext):
+        return os.path.join(self.cache_dir, key[:2], key + ext)
+
+    def _place(self, src, dest):
+        tmp = f"{dest}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            if self.link:
+                try: os.link(src, tmp)
+                except OSError: shutil.copyfile(src, tmp)
+            else: shutil.copyfile(src, tmp)
+            os.replace(tmp, dest)
+        except BaseException:
+            try: os.remove(tmp)
+            except OSError: pass
+            raise
+
+    def fetch(self, key, dest):
+        # 캐시에 있으면 dest 에 놓고 True
+        src = self._path(key, os.path.splitext(dest)[1])
+        try:
+            self._place(src, dest)
+            os.utime(src)
+        except OSError:
+            with self.lock: self.misses += 1
+            return False
+        with self.lock: self.hits += 1
+        return True
+
+    def store(self, key, path):
+        dest = self._path(key, os.path.splitext(path)[1])
+        try:
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            self._place(path, dest)
+            self._evict(os.path.getsize(dest))
+        except OSError:
+            pass
+
+    def load_value(self, key):
+        # store_value 로 보관한 값. 없거나 읽을 수 없으면 None
+        path = self._path(key, ".json")
+        try:
+            with open(path, encoding="utf-8") as f: value = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return value
+
+    def store_value(self, key, value):
+        dest = self._path(key, ".json")
+        tmp = f"{dest}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f: json.dump(value, f)
+            os.replace(tmp, dest)
+            self._evict(os.path.getsize(dest))
+        except OSError:
+            try: os.remove(tmp)
+            except OSError: pass
+
+    def _entries(self):
+        entries = []
+        for dirpath, _, filenames in os.walk(self.cache_dir):
+            for filename in filenames:
+                if filename.endswith(".tmp"): continue
+                try: st = os.stat(os.path.join(dirpath, filename))
+                except OSError: continue
+                entries.append((st.st_mtime, st.st_size, os.path.join(dirpath, filename)))
+        return entries
+
+    def _evict(self, added):
+        with self.lock:
+            if self.total is None: self.total = sum(size for _, size, _ in self._entries())
+            else: self.total += added
+            if self.total <= self.max_bytes: return
+            # 한도의 90% 까지 줄여서 매번 지우지 않게 함
+            entries = sorted(self._entries())
+            self.total = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if self.total <= self.max_bytes * 0.9: break
+                try: os.remove(path)
+                except OSError: continue
+                self.total -= size
+
+    def stats(self):
+        with self.lock: return {"hits": self.hits, "misses": self.misses}
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+def get_cache(cache_dir, max_bytes=None, link=False):
+    # 같은 설정이면 프로세스 안에서 하나의 OutputCache 를 공유
+    key = (cache_dir, max_bytes, link)
+    with _shared_lock:
+        if key not in _shared: _shared[key] = OutputCache(cache_dir, max_bytes, link)
+        return _shared[key]
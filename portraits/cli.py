@@ -0,0 +1,299 @@
+import argparse
+import os
+import sys
+
+from portraits import engine, quantize, resample
+
+def cache_opts(args):
+    # --no-cache 면 None (캐시 사용 안 함)
+    if args.no_cache: return None
+    return {"link": args.cache_link}
+
+def quantize_opts(args):
+    opts = {"method": args.quantize, "dither": args.dither}
+    if args.no_palette_cache: opts["cache_dir"] = None
+    return opts
+
+def cmd_batch(args):
+    games = engine.resolve_games(args.game)
+    if not os.path.isdir(args.src): raise SystemExit(f"폴더를 찾을 수 없습니다: {args.src}")
+    opts = quantize_opts(args)
+    quantizer = engine.get_quantizer(opts)
+    stats = engine.BatchStats()
+    paths = engine.iter_images(args.src, args.recursive)
+    deferred = []
+    for result in engine.run_batch(paths, games, args.out, args.workers, args.high_res, args.preset, opts, args.shared_palette, args.png, cache_opts(args), not args.center_crop):
+        stats.add(result)
+        deferred.extend(result["deferred"])
+        if result["error"]: print(f"[실패] {result['path']}: {result['error']}", file=sys.stderr)
+        else: print(f"[{stats.count}] {result['path']} -> {result['name']} ({len(result['outputs']) + len(result['deferred'])}개)")
+    if deferred: print(f"공통 팔레트로 256색 출력 {engine.write_shared_palette(deferred, quantizer)}개 저장")
+    print(stats.summary())
+    return 1 if stats.failed else 0
+
+def cmd_reexport(args):
+    # 자르기 기록(*.portraits.json) 을 찾아 바뀐 출력만 다시 만듦
+    from portraits import manifest
+    if not os.path.exists(args.library): raise SystemExit(f"폴더를 찾을 수 없습니다: {args.library}")
+    count = failed = written = skipped = hits = misses = 0
+    paths = manifest.find_manifests(args.library, not args.no_recursive)
+    for result in manifest.run_reexport(paths, args.workers, out_dir=args.out, force=args.force, high_res=args.high_res, preset=args.preset, png_preset=args.png, cache_opts=cache_opts(args), quantize_opts=quantize_opts(args)):
+        count += 1
+        written, skipped = written + len(result["written"]), skipped + result["skipped"]
+        hits, misses = hits + result["cache"][0], misses + result["cache"][1]
+        if result["error"]:
+            failed += 1
+            print(f"[실패] {result['path']}: {result['error']}", file=sys.stderr)
+        elif result["written"]: print(f"[{count}] {result['path']}: {len(result['written'])}개 다시 만듦, {result['skipped']}개 그대로")
+    print(f"기록 {count}개: 출력 {written}개 다시 만듦, {skipped}개 그대로, 실패 {failed}개")
+    if hits or misses: print(f"출력 캐시: 적중 {hits}, 실패 {misses}")
+    return 1 if failed else 0
+
+def cmd_convert(args):
+    # 한 게임 형식의 초상화 라이브러리를 다른 게임 형식으로 변환
+    from portraits import convert
+    src_game = engine.resolve_game(getattr(args, "from"))
+    games = [g for g in engine.resolve_games(args.to) if g != src_game]
+    if not games: raise SystemExit("변환할 대상 게임이 없습니다 (원본과 같은 게임은 빼고 변환합니다)")
+    if not os.path.isdir(args.library): raise SystemExit(f"폴더를 찾을 수 없습니다: {args.library}")
+    stats = engine.BatchStats()
+    written = skipped = 0
+    sets = convert.find_sets(args.library, src_game, not args.no_recursive, skip=[args.out])
+    for result in convert.run_convert(sets, games, args.out, args.library, src_game, args.workers, high_res=args.high_res, preset=args.preset,
+                                      png_preset=args.png, quantize_opts=quantize_opts(args), force=args.force):
+        stats.add(result)
+        written, skipped = written + len(result["outputs"]), skipped + result["skipped"]
+        if result["error"]: print(f"[실패] {result['path']} ({result['name']}): {result['error']}", file=sys.stderr)
+        elif result["outputs"]: print(f"[{stats.count}] {result['path']} -> {result['name']} ({len(result['outputs'])}개)")
+    print(f"묶음 {stats.count}개: 출력 {written}개 만듦, {skipped}개 그대로 (원본과 설정이 같은 출력)")
+    print(stats.summary())
+    return 1 if stats.failed else 0
+
+def cmd_watch(args):
+    from portraits import watch
+    service = watch.WatchService(
+        args.inbox, engine.resolve_games(args.game), args.out, args.workers, args.max_queue, args.done, args.quarantine,
+        args.status_file, args.status_port, args.interval, args.polling,
+        high_res=args.high_res, preset=args.preset, png_preset=args.png, cache_opts=cache_opts(args), auto_crop=not args.center_crop)
+    try: snapshot = service.run(once=args.once)
+    except KeyboardInterrupt: snapshot = service.metrics.snapshot()
+    print(f"처리 {snapshot['processed']}개, 격리 {snapshot['failed']}개, 평균 지연 {snapshot['latency_ms']['avg']} ms")
+    return 1 if args.once and snapshot["failed"] else 0
+
+def cmd_resample_check(args):
+    from PIL import Image
+    games = [engine.resolve_game(args.game)] if args.game else list(engine.GAME_CONFIGS)
+    with Image.open(args.image) as img:
+        img.load()
+        print(f"원본: {img.width}x{img.height}")
+        for game in games:
+            cfg = engine.GAME_CONFIGS[game]
+            for label in cfg["steps"]:
+                box = engine.snap_crop_box(engine.default_crop_box(img.width, img.height, cfg["sizes"][label]), img.size)
+                size = engine.output_size(game, label, engine.box_size(box), args.high_res)
+                print(f"{game} / {label}: {engine.box_size(box)[0]}x{engine.box_size(box)[1]} -> {size[0]}x{size[1]}")
+                for row in resample.compare_presets(img, size, box, args.repeat):
+                    print(f"  {row['preset']:<10} {row['seconds'] * 1000:8.1f} ms  PSNR {row['psnr']:6.2f} dB")
+    return 0
+
+def cmd_quantize_check(args):
+    # 지정한 이미지(없으면 합성 이미지) 를 Classics Small 크기로 자른 뒤 방식별로 256색 변환
+    from PIL import Image
+    game = engine.resolve_game("classics")
+    size = engine.GAME_CONFIGS[game]["sizes"]["Small"]
+    paths = []
+    for path in args.images:
+        paths.extend(engine.iter_images(path, False) if os.path.isdir(path) else [path])
+    smalls = []
+    if paths:
+        for path in paths:
+            with Image.open(path) as img:
+                img = img.convert("RGB")
+                smalls.append(engine.render_box(img, engine.default_crop_box(img.width, img.height, size), size))
+    else:
+        for seed in range(args.count):
+            noise = Image.effect_noise((size[0] // 4, size[1] // 4), 30 + seed * 7).resize(size, Image.BILINEAR)
+            smalls.append(Image.merge("RGB", (noise, noise.rotate(180), noise.transpose(Image.FLIP_LEFT_RIGHT))))
+    print(f"{len(smalls)}개 이미지, {size[0]}x{size[1]}, {args.colors}색")
+    for row in quantize.compare_methods(smalls, args.colors, args.repeat):
+        mode = ("공통" if row["shared"] else "개별") + (" 디더링" if row["dither"] else "")
+        print(f"  {row['method']:<14} {mode:<10} {row['seconds'] * 1000:8.1f} ms  캐시 {row['cached_seconds'] * 1000:8.1f} ms  PSNR {row['psnr']:6.2f} dB")
+    return 0
+
+def cmd_autocrop_bench(args):
+    # 지정한 이미지(없으면 인물 영역을 아는 합성 이미지) 로 자동 자르기 추천 시간과 인물 포함 비율 측정
+    from PIL import Image
+    from portraits import autocrop
+    if not autocrop.available(): print("numpy 가 없어 중앙 기본 영역만 씁니다")
+    images = []
+    for path in args.images:
+        for p in engine.iter_images(path, False) if os.path.isdir(path) else [path]:
+            with Image.open(p) as img: images.append(img.convert("RGB"))
+    result = autocrop.benchmark(engine.GAME_CONFIGS, images, args.count)
+    print(f"{result['images']}개 이미지, 모든 게임/단계 추천: 평균 {result['avg_ms']:.1f} ms, p95 {result['p95_ms']:.1f} ms")
+    if "coverage_auto" in result:
+        print(f"인물 포함 비율: 자동 {result['coverage_auto']:.1%}, 중앙 기본 {result['coverage_center']:.1%}")
+    return 0
+
+def cmd_bench(args):
+    from portraits import bench
+    data = bench.run(args.megapixels, args.formats, args.repeat)
+    if args.out:
+        bench.save(data, args.out)
+        print(f"결과 저장: {args.out}")
+    if args.baseline:
+        return 1 if bench.print_comparison(bench.compare(bench.load(args.baseline), data, args.threshold)) else 0
+    return 0
+
+def cmd_startup_bench(args):
+    from portraits import bench, startup
+    data = startup.run(args.repeat, not args.no_xvfb)
+    if args.out:
+        bench.save(data, args.out)
+        print(f"결과 저장: {args.out}")
+    if args.baseline:
+        return 1 if bench.print_comparison(bench.compare(bench.load(args.baseline), data, args.threshold)) else 0
+    return 0
+
+def cmd_bench_compare(args):
+    from portraits import bench
+    return 1 if bench.print_comparison(bench.compare(bench.load(args.baseline), bench.load(args.current), args.threshold)) else 0
+
+def cmd_memcheck(args):
+    from portraits import memcheck
+    return memcheck.run(args.loads, args.megapixels, engine.resolve_game(args.game), args.max_growth_mb)
+
+def add_cache_arguments(p):
+    p.add_argument("--no-cache", action="store_true", help="출력 캐시를 쓰지 않음")
+    p.add_argument("--cache-link", action="store_true", help="캐시된 출력을 복사 대신 하드 링크로 놓음")
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="main.py", description="Portraits Maker 명령줄 도구")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("batch", help="폴더 안의 모든 이미지를 초상화로 변환")
+    p.add_argument("src", help="원본 이미지 폴더")
+    p.add_argument("--game", required=True, help=f"게임 ({', '.join(engine.GAME_ALIASES)} 또는 전체 이름). 쉼표로 여러 개, all 이면 모든 게임")
+    p.add_argument("--workers", type=int, default=None, help="작업 프로세스 수 (기본: CPU 수)")
+    p.add_argument("--out", default=".", help="저장 폴더 (기본: 현재 폴더)")
+    p.add_argument("--high-res", action="store_true", help="EE 고해상도 모드 (최대 1024)")
+    p.add_argument("--recursive", action="store_true", help="하위 폴더까지 처리")
+    p.add_argument("--preset", choices=list(resample.PRESETS), default=resample.DEFAULT_PRESET, help="리샘플링 품질 설정")
+    p.add_argument("--png", choices=list(engine.PNG_PRESETS), default=engine.DEFAULT_PNG_PRESET, help="PNG 저장 설정 (fast: 빠른 저장, small: 가장 작은 파일)")
+    p.add_argument("--quantize", choices=list(quantize.METHODS), default=quantize.DEFAULT_METHOD, help="256색 BMP (Classics Small) 양자화 방식")
+    p.add_argument("--dither", action="store_true", help="256색 변환 시 디더링 사용")
+    p.add_argument("--shared-palette", action="store_true", help="모든 256색 출력에 공통 팔레트 하나 사용")
+    p.add_argument("--no-palette-cache", action="store_true", help="팔레트를 디스크에 캐시하지 않음")
+    p.add_argument("--center-crop", action="store_true", help="자동 자르기 추천 대신 중앙 기본 영역 사용")
+    add_cache_arguments(p)
+    p.set_defaults(func=cmd_batch)
+
+    p = sub.add_parser("reexport", help="자르기 기록을 읽어 원본/자르기/설정이 바뀐 출력만 다시 저장")
+    p.add_argument("library", help="자르기 기록(*.portraits.json) 이 있는 폴더 또는 기록 파일")
+    p.add_argument("--workers", type=int, default=None, help="작업 프로세스 수 (기본: CPU 수)")
+    p.add_argument("--out", default=None, help="저장 폴더 (기본: 기록된 폴더)")
+    p.add_argument("--force", action="store_true", help="바뀌지 않은 출력도 모두 다시 만듦")
+    p.add_argument("--high-res", dest="high_res", action="store_true", default=None, help="EE 고해상도 모드로 다시 저장")
+    p.add_argument("--standard-res", dest="high_res", action="store_false", help="EE 표준 해상도로 다시 저장")
+    p.add_argument("--preset", choices=list(resample.PRESETS), default=None, help="리샘플링 품질 설정 (기본: 기록된 설정)")
+    p.add_argument("--png", choices=list(engine.PNG_PRESETS), default=engine.DEFAULT_PNG_PRESET, help="PNG 저장 설정")
+    p.add_argument("--quantize", choices=list(quantize.METHODS), default=quantize.DEFAULT_METHOD, help="256색 BMP (Classics Small) 양자화 방식")
+    p.add_argument("--dither", action="store_true", help="256색 변환 시 디더링 사용")
+    p.add_argument("--no-palette-cache", action="store_true", help="팔레트를 디스크에 캐시하지 않음")
+    p.add_argument("--no-recursive", action="store_true", help="하위 폴더는 찾지 않음")
+    add_cache_arguments(p)
+    p.set_defaults(func=cmd_reexport)
+
+    p = sub.add_parser("convert", help="한 게임 형식의 초상화 라이브러리를 다른 게임 형식으로 일괄 변환")
+    p.add_argument("library", help="원본 초상화 폴더")
+    p.add_argument("--from", required=True, help=f"원본 게임 ({', '.join(engine.GAME_ALIASES)} 또는 전체 이름). 이 게임의 파일 이름 규칙으로 묶음을 찾음")
+    p.add_argument("--to", required=True, help="대상 게임. 쉼표로 여러 개, all 이면 원본을 뺀 모든 게임")
+    p.add_argument("--out", default=".", help="저장 폴더 (기본: 현재 폴더). 원본 폴더 구조를 따름")
+    p.add_argument("--workers", type=int, default=None, help="작업 프로세스 수 (기본: CPU 수)")
+    p.add_argument("--no-recursive", action="store_true", help="하위 폴더는 찾지 않음")
+    p.add_argument("--force", action="store_true", help="원본과 설정이 그대로인 출력도 다시 만듦")
+    p.add_argument("--high-res", action="store_true", help="EE 고해상도 모드 (최대 1024)")
+    p.add_argument("--preset", choices=list(resample.PRESETS), default=resample.DEFAULT_PRESET, help="리샘플링 품질 설정")
+    p.add_argument("--png", choices=list(engine.PNG_PRESETS), default=engine.DEFAULT_PNG_PRESET, help="PNG 저장 설정")
+    p.add_argument("--quantize", choices=list(quantize.METHODS), default=quantize.DEFAULT_METHOD, help="256색 BMP (Classics Small) 양자화 방식")
+    p.add_argument("--dither", action="store_true", help="256색 변환 시 디더링 사용")
+    p.add_argument("--no-palette-cache", action="store_true", help="팔레트를 디스크에 캐시하지 않음")
+    p.set_defaults(func=cmd_convert)
+
+    p = sub.add_parser("watch", help="폴더를 지켜보다가 새 이미지를 자동으로 초상화로 변환")
+    p.add_argument("inbox", help="지켜볼 폴더")
+    p.add_argument("--game", required=True, help="게임 (자르기 기록이 없는 이미지용). 쉼표로 여러 개, all 이면 모든 게임")
+    p.add_argument("--out", default=".", help="저장 폴더 (기본: 현재 폴더)")
+    p.add_argument("--workers", type=int, default=None, help="작업 프로세스 수 (기본: CPU 수)")
+    p.add_argument("--max-queue", type=int, default=1000, help="대기열 최대 길이")
+    p.add_argument("--done", default=None, help="처리한 원본을 옮길 폴더 (기본: <inbox>/done)")
+    p.add_argument("--quarantine", default=None, help="실패한 원본을 옮길 폴더 (기본: <inbox>/quarantine)")
+    p.add_argument("--status-file", default=None, help="대기열 길이, 처리 지연 등을 기록할 JSON 파일")
+    p.add_argument("--status-port", type=int, default=None, help="상태 JSON 을 돌려줄 로컬 포트 (127.0.0.1)")
+    p.add_argument("--interval", type=float, default=1.0, help="폴더 훑는 주기 (초, polling 방식)")
+    p.add_argument("--polling", action="store_true", help="inotify 대신 주기적으로 훑기")
+    p.add_argument("--once", action="store_true", help="지금 있는 파일만 처리하고 끝냄")
+    p.add_argument("--high-res", action="store_true", help="EE 고해상도 모드 (최대 1024)")
+    p.add_argument("--preset", choices=list(resample.PRESETS), default=resample.DEFAULT_PRESET, help="리샘플링 품질 설정")
+    p.add_argument("--png", choices=list(engine.PNG_PRESETS), default=engine.DEFAULT_PNG_PRESET, help="PNG 저장 설정")
+    p.add_argument("--center-crop", action="store_true", help="자르기 기록이 없을 때 자동 추천 대신 중앙 기본 영역 사용")
+    add_cache_arguments(p)
+    p.set_defaults(func=cmd_watch)
+
+    p = sub.add_parser("resample-check", help="품질 설정별 축소 속도와 기준 결과 대비 PSNR 비교")
+    p.add_argument("image", help="원본 이미지")
+    p.add_argument("--game", default=None, help="게임 (기본: 전체)")
+    p.add_argument("--high-res", action="store_true", help="EE 고해상도 모드 (최대 1024)")
+    p.add_argument("--repeat", type=int, default=3, help="설정별 반복 횟수")
+    p.set_defaults(func=cmd_resample_check)
+
+    p = sub.add_parser("quantize-check", help="256색 양자화 방식별 속도와 PSNR 비교")
+    p.add_argument("images", nargs="*", help="원본 이미지 또는 폴더 (없으면 합성 이미지)")
+    p.add_argument("--count", type=int, default=8, help="합성 이미지 수")
+    p.add_argument("--colors", type=int, default=256, help="색 수")
+    p.add_argument("--repeat", type=int, default=3, help="방식별 반복 횟수")
+    p.set_defaults(func=cmd_quantize_check)
+
+    p = sub.add_parser("autocrop-bench", help="자동 자르기 추천 속도와 인물 포함 비율 (중앙 기본 영역과 비교)")
+    p.add_argument("images", nargs="*", help="원본 이미지 또는 폴더 (없으면 합성 이미지)")
+    p.add_argument("--count", type=int, default=20, help="합성 이미지 수")
+    p.set_defaults(func=cmd_autocrop_bench)
+
+    p = sub.add_parser("bench", help="게임별 단계(decode, 화면 표시, 자르기, 미리보기, 저장) 벤치마크")
+    p.add_argument("--megapixels", type=float, nargs="+", default=[1, 12, 40], help="합성 원본 크기 목록 (MP, 최대 100)")
+    p.add_argument("--formats", nargs="+", choices=["jpeg", "png", "webp"], default=["jpeg", "png", "webp"], help="합성 원본 형식")
+    p.add_argument("--repeat", type=int, default=3, help="항목별 반복 횟수 (가장 빠른 값 사용)")
+    p.add_argument("--out", default=None, help="결과 JSON 파일")
+    p.add_argument("--baseline", default=None, help="비교할 기준 결과 JSON. 회귀가 있으면 실패")
+    p.add_argument("--threshold", type=float, default=0.15, help="회귀로 볼 느려짐 비율 (기본 0.15)")
+    p.set_defaults(func=cmd_bench)
+
+    p = sub.add_parser("startup-bench", help="시작 시간 벤치마크 (import 시간, 첫 화면/준비 완료까지 걸리는 시간)")
+    p.add_argument("--repeat", type=int, default=5, help="반복 횟수 (가장 빠른 값 사용)")
+    p.add_argument("--no-xvfb", action="store_true", help="화면이 없을 때 Xvfb 가상 화면을 띄우지 않음")
+    p.add_argument("--out", default=None, help="결과 JSON 파일")
+    p.add_argument("--baseline", default=None, help="비교할 기준 결과 JSON. 회귀가 있으면 실패")
+    p.add_argument("--threshold", type=float, default=0.15, help="회귀로 볼 느려짐 비율 (기본 0.15)")
+    p.set_defaults(func=cmd_startup_bench)
+
+    p = sub.add_parser("bench-compare", help="저장된 벤치마크 결과 두 개 비교")
+    p.add_argument("baseline", help="기준 결과 JSON")
+    p.add_argument("current", help="비교할 결과 JSON")
+    p.add_argument("--threshold", type=float, default=0.15, help="회귀로 볼 느려짐 비율 (기본 0.15)")
+    p.set_defaults(func=cmd_bench_compare)
+
+    p = sub.add_parser("memcheck", help="큰 이미지를 연달아 불러올 때 최대 메모리 사용량 확인")
+    p.add_argument("--loads", type=int, default=6, help="불러올 횟수")
+    p.add_argument("--megapixels", type=float, default=40, help="합성 원본 이미지 크기 (MP)")
+    p.add_argument("--game", default="ee", help="게임")
+    p.add_argument("--max-growth-mb", type=float, default=100, help="두 번째 불러오기 이후 허용할 최대 RSS 증가량 (MB). 넘으면 실패 (기본 100)")
+    p.set_defaults(func=cmd_memcheck)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except ValueError as e:
+        print(f"에러: {e}", file=sys.stderr)
+        return 2
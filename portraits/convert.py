@@ -0,0 +1,177 @@
+import json
+import math
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+
+from PIL import Image
+
+from portraits import engine, manifest, resample
+
+# 한 게임 형식으로 모아 둔 초상화 라이브러리를 다른 게임 형식으로 일괄 변환
+# 묶음(한 캐릭터의 단계별 이미지) 은 게임 설정의 이름 규칙과 형식(확장자) 으로 찾고, 모든 단계가 있어야 묶음으로 봄
+#   suffix: 한 폴더 안의 <이름><접미사>.<확장자> (예: BobL.bmp, BobM.bmp / Bob_lg.png, Bob_sm.png)
+#   use_folder: <이름>/<단계>.png 폴더 (예: Bob/FullLength.png, Bob/Medium.png, Bob/Small.png)
+# 대상 단계마다 비율과 해상도가 가장 가까운 원본 단계를 골라, 비율에 맞게 가운데를 잘라 축소함
+# 묶음마다 출력 지문(원본 파일과 출력 설정) 을 <출력 위치>/.<이름>.convert.json 에 두고, 지문이 같은 출력은 다시 만들지 않음
+
+# 대상 해상도보다 큰 원본을 줄이는 비용 (작은 원본을 키우는 비용은 1)
+DOWNSCALE_WEIGHT = 0.1
+RECORD_SUFFIX = ".convert.json"
+
+def find_sets(root, game, recursive=True, skip=()):
+    # 폴더를 하나씩 읽으며 찾은 묶음을 바로 내보냄. 전체 파일 목록을 메모리에 두지 않음
+    # 묶음: {"dir": 원본 폴더, "parent": 출력 위치 기준 폴더, "name": 출력 이름, "files": {단계: 경로}}
+    cfg = engine.GAME_CONFIGS[game]
+    skip = {os.path.realpath(p) for p in skip}
+    # 이 프로그램이 저장한 다른 게임 폴더는 이름 규칙이 겹칠 수 있으므로 (L/M/S 접미사) 들어가지 않음
+    other_games = {engine.safe_game_name(g) for g in engine.GAME_CONFIGS if g != game}
+    # (폴더, 부모 폴더에서 쓴 이름). 같은 곳에 저장되는 묶음끼리 이름이 겹치지 않게 함
+    stack = [(root, set())]
+    while stack:
+        folder, parent_used = stack.pop()
+        if os.path.realpath(folder) in skip: continue
+        try:
+            with os.scandir(folder) as it: entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+        used = set()
+        # 원본 게임 형식의 파일만 봄 (같은 폴더의 Model.jpg 같은 다른 파일은 묶음이 아님)
+        ext = "." + cfg["format"].lower()
+        files = [e for e in entries if os.path.splitext(e.name)[1].lower() == ext and e.is_file()]
+        if cfg.get("use_folder"):
+            labels = {label.lower(): label for label in cfg["steps"]}
+            found = {labels[os.path.splitext(e.name)[0].lower()]: e.path for e in files if os.path.splitext(e.name)[0].lower() in labels}
+            if len(found) == len(labels): yield {"dir": folder, "parent": os.path.dirname(folder), "name": engine.unique_name(os.path.basename(folder), parent_used), "files": found}
+        else:
+            yield from suffix_sets(folder, files, cfg, used)
+        if recursive: stack.extend((e.path, used) for e in reversed(entries) if e.is_dir(follow_symlinks=False) and e.name not in other_games)
+
+def suffix_sets(folder, files, cfg, used):
+    # 접미사가 긴 것부터 맞춰 봄 (이름 자체가 접미사로 끝나는 경우 대비)
+    suffixes = sorted(cfg["suffix"].items(), key=lambda item: -len(item[1]))
+    sets = {}
+    for entry in files:
+        stem = os.path.splitext(entry.name)[0]
+        for label, suffix in suffixes:
+            if len(stem) > len(suffix) and stem.lower().endswith(suffix.lower()):
+                name = stem[:-len(suffix)]
+                sets.setdefault(name.lower(), (name, {}))[1].setdefault(label, entry.path)
+                break
+    for name, found in sets.values():
+        if len(found) == len(cfg["steps"]): yield {"dir": folder, "parent": folder, "name": engine.unique_name(name, used), "files": found}
+
+def output_base(out_dir, root, portrait_set, game):
+    # 원본 라이브러리의 폴더 구조를 그대로 따름. 이 프로그램이 저장한 구조(<게임 폴더>/...) 면 원본 게임 폴더는 뺌
+    rel = os.path.relpath(portrait_set["parent"], root)
+    parts = [] if rel == os.curdir else rel.split(os.sep)
+    if parts and parts[-1] == engine.safe_game_name(game): parts.pop()
+    return os.path.join(out_dir, *parts)
+
+def source_cost(size, target):
+    # 원본 크기에서 target 비율로 자를 때 비율 차이 + 해상도 차이 (로그 배율)
+    box = engine.fit_box((0, 0, size[0], size[1]), engine.aspect(target), size)
+    h = engine.box_size(box)[1]
+    return abs(math.log(engine.aspect(size) / engine.aspect(target))) + max(0.0, math.log(target[1] / h)) + DOWNSCALE_WEIGHT * max(0.0, math.log(h / target[1]))
+
+def match_source(sizes, target):
+    # sizes: {원본 단계: 크기}. 대상 크기에 가장 가까운 원본 단계
+    return min(sizes, key=lambda label: source_cost(sizes[label], target))
+
+def plan_set(sizes, games, high_res=False):
+    # {(원본 단계, 영역, 출력 크기): [(게임, 단계), ...]}. 같은 축소는 한 번만 하고 여러 게임 폴더에 나눠 씀
+    plan = {}
+    for game in games:
+        for label in engine.GAME_CONFIGS[game]["steps"]:
+            target = engine.GAME_CONFIGS[game]["sizes"][label]
+            src_label = match_source(sizes, target)
+            box = engine.fit_box((0, 0) + sizes[src_label], engine.aspect(target), sizes[src_label])
+            plan.setdefault((src_label, box, engine.output_size(game, label, engine.box_size(box), high_res)), []).append((game, label))
+    return plan
+
+def record_path(base_dir, name):
+    return os.path.join(base_dir, f".{name}{RECORD_SUFFIX}")
+
+def load_record(path):
+    # {출력 상대 경로: 지문}. 없거나 읽을 수 없으면 빈 기록
+    try:
+        with open(path, encoding="utf-8") as f: data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+def output_fingerprint(src_path, box, size, game, label, preset, png_preset, quantize_opts):
+    # 출력 캐시 키와 같은 설정 (영역, 크기, 품질, 형식/팔레트) 에 원본 파일의 크기와 수정 시각을 더함
+    st = os.stat(src_path)
+    return engine.output_key([os.path.abspath(src_path), st.st_size, st.st_mtime_ns], box, size, preset, game, label, png_preset, quantize_opts)
+
+def decode(img):
+    img.load()
+    # 256색/흑백 원본은 LANCZOS 로 축소할 수 있도록 RGB(A) 로 바꿈
+    if img.mode in ("RGB", "RGBA"): return img
+    return img.convert("RGBA" if img.mode in ("LA", "PA") or "transparency" in img.info else "RGB")
+
+def convert_set(portrait_set, games, base_dir, high_res=False, preset=resample.DEFAULT_PRESET, png_preset=engine.DEFAULT_PNG_PRESET, quantize_opts=None, force=False):
+    # 작업 프로세스에서 실행. 지문이 기록과 같은 출력이 이미 있으면 (force 가 아니면) 그대로 둠
+    name = portrait_set["name"]
+    timings = dict.fromkeys(engine.STAGES, 0.0)
+    result = {"path": portrait_set["dir"], "name": name, "outputs": [], "skipped": 0, "timings": timings, "error": None}
+    headers, sources = {}, {}
+    try:
+        engine.load_plugins()
+        t = time.perf_counter()
+        for label, path in portrait_set["files"].items(): headers[label] = Image.open(path)
+        sizes = {label: img.size for label, img in headers.items()}
+        timings["decode"] = time.perf_counter() - t
+
+        t = time.perf_counter()
+        plan = plan_set(sizes, games, high_res)
+        timings["crop"] = time.perf_counter() - t
+
+        rec_path = record_path(base_dir, name)
+        record = load_record(rec_path)
+        done = {}
+        for (src_label, box, size), targets in plan.items():
+            final_img = None
+            for game, label in targets:
+                out = os.path.join(engine.output_dir(base_dir, game, name), engine.output_filename(game, name, label))
+                rel = os.path.relpath(out, base_dir)
+                fp = output_fingerprint(portrait_set["files"][src_label], box, size, game, label, preset, png_preset, quantize_opts)
+                if not force and record.get(rel) == fp and os.path.exists(out):
+                    result["skipped"] += 1
+                    continue
+                if final_img is None:
+                    if src_label not in sources:
+                        t = time.perf_counter()
+                        sources[src_label] = decode(headers[src_label])
+                        timings["decode"] += time.perf_counter() - t
+                    t = time.perf_counter()
+                    final_img = engine.render_box(sources[src_label], box, size, preset)
+                    timings["resize"] += time.perf_counter() - t
+                t = time.perf_counter()
+                os.makedirs(os.path.dirname(out), exist_ok=True)
+                engine.encode_portrait(final_img, out, game, label, engine.get_quantizer(quantize_opts), png_preset)
+                timings["encode"] += time.perf_counter() - t
+                result["outputs"].append(out)
+                done[rel] = fp
+        if done:
+            record.update(done)
+            manifest.save(record, rec_path)
+    except Exception as e:
+        result["error"] = str(e)
+    finally:
+        for img in list(headers.values()) + list(sources.values()): img.close()
+    return result
+
+def run_convert(sets, games, out_dir, root, src_game, workers=None, **options):
+    # sets: find_sets 결과 (제너레이터). run_batch 와 같이 끝나는 순서대로 내보내고 대기 작업 수를 제한함
+    # options: convert_set 의 high_res, preset, png_preset, quantize_opts, force
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for portrait_set in sets:
+            pending.add(pool.submit(convert_set, portrait_set, games, output_base(out_dir, root, portrait_set, src_game), **options))
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done: yield future.result()
+        for future in as_completed(pending): yield future.result()
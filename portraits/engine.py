@@ -0,0 +1,447 @@
+import hashlib
+import importlib
+import math
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+
+from PIL import Image
+
+from portraits import autocrop, cache, instrument, quantize, resample
+
+EE_GAME = "D&D EE (BG1, BG2, IWD1)"
+
+# 게임 설정 구성
+GAME_CONFIGS = {
+    EE_GAME: {
+        "steps": ["Large", "Medium"],
+        "sizes": {"Large": (210, 330), "Medium": (76, 118)},
+        "max_h": 512,
+        "format": "BMP", "suffix": {"Large": "L", "Medium": "M"}
+    },
+    "D&D Classics (BG1, BG2, IWD1)": {
+        "steps": ["Large", "Medium", "Small"],
+        "sizes": {"Large": (210, 330), "Medium": (110, 170), "Small": (38, 60)},
+        "format": "BMP", "suffix": {"Large": "L", "Medium": "M", "Small": "S"}
+    },
+    "Icewind Dale 2 Classic": {
+        "steps": ["Large", "Small"],
+        "sizes": {"Large": (210, 330), "Small": (42, 42)},
+        "format": "BMP", "suffix": {"Large": "L", "Small": "S"}
+    },
+    "Pathfinder: Kingmaker & WotR": {
+        "steps": ["FullLength", "Medium", "Small"],
+        "sizes": {"FullLength": (692, 1024), "Medium": (330, 432), "Small": (185, 242)},
+        "format": "PNG", "use_folder": True
+    },
+    "Pillars of Eternity 1 & 2": {
+        "steps": ["Large", "Small"],
+        "sizes": {"Large": (210, 330), "Small": (76, 96)},
+        "format": "PNG", "suffix": {"Large": "_lg", "Small": "_sm"}
+    }
+}
+
+# CLI 에서 쓰는 짧은 게임 이름
+GAME_ALIASES = {
+    "ee": EE_GAME,
+    "classics": "D&D Classics (BG1, BG2, IWD1)",
+    "iwd2": "Icewind Dale 2 Classic",
+    "pathfinder": "Pathfinder: Kingmaker & WotR",
+    "pillars": "Pillars of Eternity 1 & 2",
+}
+
+VALID_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+# Pillow 기본 플러그인(preinit: BMP, GIF, JPEG, PPM, PNG) 밖에서 필요한 형식
+EXTRA_PLUGINS = ("WebPImagePlugin",)
+DEFAULT_CHAR_NAME = "MYCHAR"
+EDGE_SNAP = 10
+
+def resolve_game(value):
+    if value in GAME_CONFIGS: return value
+    if value.lower() in GAME_ALIASES: return GAME_ALIASES[value.lower()]
+    raise ValueError(f"알 수 없는 게임: {value}")
+
+def resolve_games(value):
+    # "all" 또는 쉼표로 구분한 게임 목록
+    if value.lower() == "all": return list(GAME_CONFIGS)
+    if value in GAME_CONFIGS: return [value]
+    return [resolve_game(v.strip()) for v in value.split(",")]
+
+def safe_game_name(game):
+    return re.sub(r'[\\/:*?"<>|]', '', game)
+
+def sanitize_char_name(value):
+    return re.sub(r'[^a-zA-Z0-9]', '', value)[:15]
+
+def is_supported_image(path):
+    return path.lower().endswith(VALID_EXTENSIONS)
+
+def load_plugins():
+    # 지원 형식의 플러그인만 등록함. 예전 Pillow 는 처음 보는 형식을 열 때 Image.init() 으로 모든 플러그인(수십 개)을 불러옴
+    Image.preinit()
+    for name in EXTRA_PLUGINS: importlib.import_module(f"PIL.{name}")
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""): h.update(chunk)
+    return h.hexdigest()
+
+def default_cache_dir(*parts):
+    # PORTRAITS_CACHE_DIR 환경 변수, 없으면 사용자 캐시 폴더
+    base = os.environ.get("PORTRAITS_CACHE_DIR")
+    if not base:
+        root = os.environ.get("LOCALAPPDATA") if sys.platform == "win32" else os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+        base = os.path.join(root or os.path.expanduser("~"), "PortraitsMaker")
+    return os.path.join(base, *parts)
+
+# --- 크기 규칙 ---
+def ee_max_limit(label, high_res):
+    return 1024 if high_res else (512 if label == "Large" else 118)
+
+def output_size(game, label, orig_size, high_res=False):
+    cfg = GAME_CONFIGS[game]
+    orig_w, orig_h = orig_size
+    base_w, base_h = cfg["sizes"][label]
+    ratio = base_w / base_h
+    if game == EE_GAME:
+        max_limit = ee_max_limit(label, high_res)
+        if orig_h > max_limit: return round(max_limit * ratio), max_limit
+    elif "max_h" in cfg:
+        if orig_h > cfg["max_h"]: return round(cfg["max_h"] * ratio), cfg["max_h"]
+    elif orig_w > base_w or orig_h > base_h:
+        return base_w, base_h
+    return orig_w, orig_h
+
+def default_crop_box(img_w, img_h, target_size):
+    # 이미지 중앙에 가로 70% 크기의 기본 박스
+    r = target_size[0] / target_size[1]
+    bw = img_w * 0.7
+    bh = bw / r
+    if bh > img_h * 0.9:
+        bh = img_h * 0.8
+        bw = bh * r
+    x1, y1 = (img_w - bw) / 2, (img_h - bh) / 2
+    return x1, y1, x1 + bw, y1 + bh
+
+def box_size(box):
+    return box[2] - box[0], box[3] - box[1]
+
+def snap_crop_box(box, img_size, snap=EDGE_SNAP):
+    # 가장자리 근처(snap 픽셀 이내)는 가장자리로 붙임. 확대한 화면에서는 GUI 가 더 작은 값을 줌
+    img_w, img_h = img_size
+    rx1, ry1, rx2, ry2 = (round(v) for v in box)
+    if rx1 < snap: rx1 = 0
+    if ry1 < snap: ry1 = 0
+    if abs(rx2 - img_w) < snap: rx2 = img_w
+    if abs(ry2 - img_h) < snap: ry2 = img_h
+    return max(0, rx1), max(0, ry1), min(img_w, rx2), min(img_h, ry2)
+
+# --- 저장 ---
+def output_dir(base_dir, game, name):
+    save_dir = os.path.join(base_dir, safe_game_name(game))
+    return os.path.join(save_dir, name) if GAME_CONFIGS[game].get("use_folder") else save_dir
+
+def output_filename(game, name, label):
+    cfg = GAME_CONFIGS[game]
+    return f"{label}.png" if cfg.get("use_folder") else f"{name}{cfg['suffix'][label]}.{cfg['format'].lower()}"
+
+def render_box(src, box, size, preset=resample.DEFAULT_PRESET):
+    # 자른 사본을 만들지 않고 원본의 box 영역에서 바로 리샘플링
+    with instrument.stage("resize", box=box, size=size, preset=preset):
+        return resample.resize(src, size, preset, box)
+
+def uses_palette(game, label):
+    return "Classics" in game and label == "Small"
+
+def get_quantizer(opts=None):
+    # opts: quantize.Quantizer 인자 (method, colors, dither, cache_dir). 기본은 사용자 캐시 폴더에 팔레트 저장
+    opts = dict(opts or {})
+    opts.setdefault("cache_dir", default_cache_dir("palettes"))
+    return quantize.get_quantizer(**opts)
+
+# PNG 저장 설정: fast 는 빠른 저장, small 은 가장 작은 파일 (느림)
+PNG_PRESETS = {"fast": {"compress_level": 1}, "balanced": {"compress_level": 6}, "small": {"compress_level": 9, "optimize": True}}
+DEFAULT_PNG_PRESET = "balanced"
+
+def atomic_save(img, path, fmt, **params):
+    # 임시 파일에 다 쓴 뒤 이름을 바꿔서, 중간에 죽어도 게임 폴더에 반쯤 쓴 파일이 남지 않게 함
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        img.save(tmp, fmt, **params)
+        os.replace(tmp, path)
+    except BaseException:
+        try: os.remove(tmp)
+        except OSError: pass
+        raise
+
+def encode_portrait(img, path, game, label, quantizer=None, png_preset=DEFAULT_PNG_PRESET):
+    if png_preset not in PNG_PRESETS: raise ValueError(f"알 수 없는 PNG 설정: {png_preset}")
+    if GAME_CONFIGS[game]["format"] == "PNG": atomic_save(img, path, "PNG", **PNG_PRESETS[png_preset])
+    elif uses_palette(game, label): atomic_save((quantizer or get_quantizer()).apply(img), path, "BMP")
+    else: atomic_save(img if img.mode == "RGB" else img.convert("RGB"), path, "BMP")
+
+def get_output_cache(opts=None):
+    # opts: cache.OutputCache 인자 (cache_dir, max_bytes, link). 기본은 사용자 캐시 폴더
+    opts = dict(opts or {})
+    opts.setdefault("cache_dir", default_cache_dir("outputs"))
+    return cache.get_cache(**opts)
+
+def palette_options(quantize_opts=None):
+    # 256색 출력의 픽셀을 바꾸는 양자화 설정 (팔레트 캐시 위치는 뺌)
+    opts = {k: v for k, v in (quantize_opts or {}).items() if k != "cache_dir"}
+    return {"method": quantize.DEFAULT_METHOD, "colors": 256, "dither": False, **opts}
+
+def output_key(source_hash, box, size, preset, game, label, png_preset=DEFAULT_PNG_PRESET, quantize_opts=None):
+    # 키가 같으면 저장되는 파일도 같음. 게임이 달라도 형식과 설정이 같으면 같은 키
+    fmt = GAME_CONFIGS[game]["format"]
+    if fmt == "PNG": options = PNG_PRESETS[png_preset]
+    elif uses_palette(game, label): options = palette_options(quantize_opts)
+    else: options = "RGB"
+    return cache.make_key(source_hash, list(box), list(size), preset, fmt, options)
+
+def write_shared_palette(deferred, quantizer):
+    # 일괄 처리에서 미뤄 둔 256색 출력을 공통 팔레트 하나로 저장
+    if not deferred: return 0
+    palette = quantizer.palette_for([img for _, img in deferred])
+    for path, img in deferred: atomic_save(quantizer.apply(img, palette), path, "BMP")
+    return len(deferred)
+
+def _write_outputs(tasks, base_dir, name, progress, png_preset, output_cache=None):
+    # tasks: [(최종 이미지를 돌려주는 함수, [(게임, 단계), ...], 캐시 키 재료)]. 축소는 한 번만 하고 모든 대상에 인코딩
+    # 캐시 키 재료 (원본 해시, 영역, 크기, 품질 설정) 가 있으면 캐시에 있는 출력은 복사만 하고 축소도 건너뜀
+    # 크기별 축소/인코딩은 GIL 을 놓으므로 스레드로 동시에 처리
+    total = sum(len(targets) for _, targets, _ in tasks)
+    for game in {game for _, targets, _ in tasks for game, _ in targets}: os.makedirs(output_dir(base_dir, game, name), exist_ok=True)
+
+    def write(render, targets, key):
+        img = None
+        for game, label in targets:
+            path = os.path.join(output_dir(base_dir, game, name), output_filename(game, name, label))
+            ck = output_key(*key, game, label, png_preset) if output_cache and key else None
+            if ck and output_cache.fetch(ck, path): continue
+            if img is None: img = render()
+            with instrument.stage("encode", game=game, label=label, size=img.size, png_preset=png_preset):
+                encode_portrait(img, path, game, label, png_preset=png_preset)
+            if ck: output_cache.store(ck, path)
+        return len(targets)
+
+    if progress: progress(0, total)
+    done = 0
+    with ThreadPoolExecutor(max_workers=max(len(tasks), 1), thread_name_prefix="encode") as pool:
+        futures = [pool.submit(write, *task) for task in tasks]
+        try:
+            for future in as_completed(futures):
+                done += future.result()
+                if progress: progress(done, total)
+        except BaseException:
+            for future in futures: future.cancel()
+            raise
+
+def write_portraits(finals, base_dir, game, name, progress=None, png_preset=DEFAULT_PNG_PRESET, sources=None, output_cache=None):
+    # 이미 최종 크기로 만들어진 이미지를 인코딩만 해서 저장
+    # progress(완료 수, 전체 수) 는 취소 시 예외를 던져 저장을 중단할 수 있음
+    # sources: {단계: (원본 해시, 자르기 영역, 품질 설정)} 출력 캐시 키용
+    sources = sources or {}
+    tasks = [(lambda img=img: img, [(game, label)], sources[label][:2] + (img.size, sources[label][2]) if label in sources else None) for label, img in finals.items()]
+    _write_outputs(tasks, base_dir, name, progress, png_preset, output_cache)
+    return output_dir(base_dir, game, name)
+
+# --- 여러 게임 한 번에 내보내기 ---
+# 비율 차이가 이 정도 이하면 같은 자르기 영역을 그대로 씀
+ASPECT_TOLERANCE = 0.02
+
+def aspect(size):
+    return size[0] / size[1]
+
+def fit_box(box, ratio, img_size):
+    # box 의 중심을 유지하며 ratio(가로/세로) 에 맞게 줄인 영역
+    w, h = box_size(box)
+    if abs(w / h / ratio - 1) <= ASPECT_TOLERANCE: return tuple(box)
+    nw, nh = (h * ratio, h) if w / h > ratio else (w, w / ratio)
+    cx, cy = (box[0] + box[2]) / 2, (box[1] + box[3]) / 2
+    return snap_crop_box((cx - nw / 2, cy - nh / 2, cx + nw / 2, cy + nh / 2), img_size)
+
+def match_box(boxes, size):
+    # 목표 크기와 비율이 가장 가까운 자르기 영역
+    return min(boxes, key=lambda b: abs(math.log(aspect(box_size(b)) / aspect(size))))
+
+def default_boxes(img_size, games=None, proposer=None):
+    # 일괄 처리용: 게임별 목표 비율마다 기본 영역 하나. proposer(autocrop.CropProposer) 가 있으면 추천 1순위, 없으면 중앙
+    boxes = {}
+    for game in games or GAME_CONFIGS:
+        for size in GAME_CONFIGS[game]["sizes"].values():
+            if aspect(size) in boxes: continue
+            box = proposer.best(size) if proposer else default_crop_box(img_size[0], img_size[1], size)
+            boxes[aspect(size)] = snap_crop_box(box, img_size)
+    return list(boxes.values())
+
+def plan_exports(boxes, img_size, games=None, high_res=False, fixed=None):
+    # {(원본 영역, 출력 크기): [(게임, 단계), ...]}. 같은 영역과 크기의 축소는 한 번만 하고 여러 게임 폴더에 나눠 씀
+    # fixed: {(게임, 단계): 영역} 사용자가 직접 고른 영역은 비율 맞추기 없이 그대로 씀
+    plan = {}
+    fixed = fixed or {}
+    for game in games or GAME_CONFIGS:
+        for label in GAME_CONFIGS[game]["steps"]:
+            target = GAME_CONFIGS[game]["sizes"][label]
+            box = tuple(fixed[game, label]) if (game, label) in fixed else fit_box(match_box(boxes, target), aspect(target), img_size)
+            plan.setdefault((box, output_size(game, label, box_size(box), high_res)), []).append((game, label))
+    return plan
+
+def export_plan(src, plan, base_dir, name, progress=None, preset=resample.DEFAULT_PRESET, png_preset=DEFAULT_PNG_PRESET, ready=None, source_hash=None, output_cache=None):
+    # ready: {(영역, 크기): 이미 만들어 둔 이미지} (GUI 의 미리 만든 결과)
+    ready = ready or {}
+    tasks = [(lambda key=key: ready[key] if key in ready else render_box(src, key[0], key[1], preset), targets, (source_hash, key[0], key[1], preset) if source_hash else None)
+             for key, targets in plan.items()]
+    _write_outputs(tasks, base_dir, name, progress, png_preset, output_cache)
+    return sorted({output_dir(base_dir, game, name) for targets in plan.values() for game, _ in targets})
+
+# --- 일괄 처리 ---
+STAGES = ("decode", "crop", "resize", "encode")
+
+def iter_images(src_dir, recursive=False):
+    # 하위 폴더는 차례가 왔을 때만 읽으며 경로를 하나씩 내보냄
+    with os.scandir(src_dir) as it:
+        entries = sorted(it, key=lambda e: e.name)
+    for entry in entries:
+        if entry.is_dir():
+            if recursive: yield from iter_images(entry.path, recursive)
+        elif is_supported_image(entry.name):
+            yield entry.path
+
+def unique_char_name(path, used):
+    return unique_name(os.path.splitext(os.path.basename(path))[0], used)
+
+def unique_name(value, used):
+    # used 에 없는 캐릭터 이름 (대소문자 구분 없이). 쓴 이름은 used 에 더함
+    base = sanitize_char_name(value) or DEFAULT_CHAR_NAME
+    name, n = base, 1
+    while name.lower() in used:
+        n += 1
+        name = f"{base[:15 - len(str(n))]}{n}"
+    used.add(name.lower())
+    return name
+
+def auto_crop_key(source_hash, games):
+    # 자동 추천 영역 캐시 키. 목표 비율과 분석 설정이 같으면 같은 영역
+    ratios = list(dict.fromkeys(aspect(size) for game in games for size in GAME_CONFIGS[game]["sizes"].values()))
+    return cache.make_key("auto_crop", source_hash, ratios, autocrop.ANALYSIS_SIDE, autocrop.SCALES, autocrop.MIN_SCALE, autocrop.STRIDE, autocrop.AREA_PENALTY)
+
+def process_file(path, game, out_dir, name, high_res=False, preset=resample.DEFAULT_PRESET, quantize_opts=None, defer_palette=False, png_preset=DEFAULT_PNG_PRESET, cache_opts=None, auto_crop=True):
+    # defer_palette 이면 256색 출력은 저장하지 않고 결과의 deferred 로 돌려줌 (공통 팔레트용)
+    # game 에 게임 목록을 주면 한 번 디코딩해서 같은 축소 결과를 모든 게임 폴더에 나눠 저장
+    # cache_opts 가 None 이 아니면 출력 캐시 사용. 모든 출력이 캐시에 있으면 디코딩도 하지 않음
+    # auto_crop 이면 작은 축소본으로 자르기 영역을 추천받고, 아니면 중앙 기본 영역. 추천 영역도 캐시에 두어 다시 분석하지 않음
+    games = [game] if isinstance(game, str) else list(game)
+    timings = dict.fromkeys(STAGES, 0.0)
+    outputs, deferred = [], []
+    output_cache = get_output_cache(cache_opts) if cache_opts is not None else None
+    hits = misses = 0
+    try:
+        load_plugins()
+        t = time.perf_counter()
+        source_hash = file_hash(path) if output_cache else None
+        with Image.open(path) as src:
+            timings["decode"] = time.perf_counter() - t
+
+            t = time.perf_counter()
+            box_key = auto_crop_key(source_hash, games) if output_cache and auto_crop else None
+            boxes = output_cache.load_value(box_key) if box_key else None
+            timings["crop"] = time.perf_counter() - t
+            loaded = False
+            if boxes is None:
+                # JPEG 는 작은 축소 디코딩으로 분석하고, 다른 형식은 원본을 한 번만 디코딩해서 분석과 출력에 같이 씀
+                loaded = auto_crop and src.format != "JPEG"
+                if loaded:
+                    t = time.perf_counter()
+                    src.load()
+                    timings["decode"] += time.perf_counter() - t
+                t = time.perf_counter()
+                proposer = None
+                if auto_crop: proposer = autocrop.CropProposer.from_image(src) if loaded else autocrop.CropProposer.from_path(path)
+                boxes = default_boxes(src.size, games, proposer)
+                # numpy 가 없어 중앙 영역을 쓴 경우는 보관하지 않음
+                if box_key and proposer.integral is not None: output_cache.store_value(box_key, boxes)
+                timings["crop"] += time.perf_counter() - t
+            t = time.perf_counter()
+            plan = plan_exports([tuple(b) for b in boxes], src.size, games, high_res)
+            timings["crop"] += time.perf_counter() - t
+
+            for g in games: os.makedirs(output_dir(out_dir, g, name), exist_ok=True)
+            for (box, size), targets in plan.items():
+                final_img = None
+                for g, label in targets:
+                    save_full_path = os.path.join(output_dir(out_dir, g, name), output_filename(g, name, label))
+                    defer = defer_palette and uses_palette(g, label)
+                    key = output_key(source_hash, box, size, preset, g, label, png_preset, quantize_opts) if output_cache and not defer else None
+                    if key:
+                        if output_cache.fetch(key, save_full_path):
+                            hits += 1
+                            outputs.append(save_full_path)
+                            continue
+                        misses += 1
+                    if final_img is None:
+                        if not loaded:
+                            t = time.perf_counter()
+                            src.load()
+                            timings["decode"] += time.perf_counter() - t
+                            loaded = True
+                        t = time.perf_counter()
+                        final_img = render_box(src, box, size, preset)
+                        timings["resize"] += time.perf_counter() - t
+                    if defer:
+                        deferred.append((save_full_path, final_img))
+                        continue
+                    t = time.perf_counter()
+                    encode_portrait(final_img, save_full_path, g, label, get_quantizer(quantize_opts), png_preset)
+                    if key: output_cache.store(key, save_full_path)
+                    timings["encode"] += time.perf_counter() - t
+                    outputs.append(save_full_path)
+    except Exception as e:
+        return {"path": path, "name": name, "outputs": outputs, "deferred": deferred, "timings": timings, "cache": (hits, misses), "error": str(e)}
+    return {"path": path, "name": name, "outputs": outputs, "deferred": deferred, "timings": timings, "cache": (hits, misses), "error": None}
+
+def run_batch(paths, game, out_dir, workers=None, high_res=False, preset=resample.DEFAULT_PRESET, quantize_opts=None, defer_palette=False, png_preset=DEFAULT_PNG_PRESET, cache_opts=None, auto_crop=True):
+    # 결과는 끝나는 순서대로 내보내고, 동시에 대기하는 작업 수는 제한함
+    workers = workers or os.cpu_count() or 1
+    used = set()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for path in paths:
+            pending.add(pool.submit(process_file, path, game, out_dir, unique_char_name(path, used), high_res, preset, quantize_opts, defer_palette, png_preset, cache_opts, auto_crop))
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done: yield future.result()
+        for future in as_completed(pending): yield future.result()
+
+class BatchStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.count = 0
+        self.failed = 0
+        self.stage_totals = dict.fromkeys(STAGES, 0.0)
+        self.cache_hits = self.cache_misses = 0
+
+    def add(self, result):
+        self.count += 1
+        if result["error"]: self.failed += 1
+        hits, misses = result.get("cache", (0, 0))
+        self.cache_hits, self.cache_misses = self.cache_hits + hits, self.cache_misses + misses
+        for stage, sec in result["timings"].items():
+            self.stage_totals[stage] = self.stage_totals.get(stage, 0.0) + sec
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        done = self.count - self.failed
+        lines = [
+            f"처리: {done}개 성공, {self.failed}개 실패 / {elapsed:.2f}초",
+            f"처리량: {done / elapsed if elapsed > 0 else 0.0:.2f} images/s",
+        ]
+        for stage, total in self.stage_totals.items():
+            avg = total / self.count * 1000 if self.count else 0.0
+            lines.append(f"  {stage:<8} 합계 {total:8.2f}s  평균 {avg:8.1f}ms/image")
+        if self.cache_hits or self.cache_misses:
+            lines.append(f"출력 캐시: 적중 {self.cache_hits}, 실패 {self.cache_misses} ({self.cache_hits / (self.cache_hits + self.cache_misses):.0%})")
+        return "\n".join(lines)
@@ -0,0 +1,160 @@
+import atexit
+import functools
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# 단계별 소요 시간/메모리 기록 (기본 꺼짐)
+# 켜는 방법: PORTRAITS_TRACE=1 환경 변수 또는 --trace 옵션
+# 세션 전체 cProfile / tracemalloc 기록: PORTRAITS_PROFILE=1 또는 --profile
+
+LOG_NAME = "portraits-trace.jsonl"
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 3
+
+enabled = False
+# logging/json 은 기록을 켤 때만 불러옴 (프로그램 시작 시간 단축)
+_logger = None
+_profile = None
+# tracemalloc 최대치는 프로세스 전체 값이라 단계가 겹치면 서로 지움. 진행 중인 단계가 없을 때 시작한 단계만 최대치를 새로 재고,
+# 그동안 다른 스레드의 단계가 시작되지 않았을 때만 py_peak_kb 로 기록함 (같은 스레드 안에서 부르는 단계는 바깥 단계에 포함)
+_stage_lock = threading.Lock()
+_running = {}
+_peak = {"owner": None, "clean": False}
+
+def memory_mb():
+    # (현재 RSS, 프로세스 최대 RSS) MB. 측정할 수 없으면 None
+    if sys.platform == "win32":
+        try:
+            import ctypes
+            from ctypes import wintypes
+            class Counters(ctypes.Structure):
+                _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [(n, ctypes.c_size_t) for n in (
+                    "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage", "QuotaPagedPoolUsage",
+                    "QuotaPeakNonPagedPoolUsage", "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage")]
+            c = Counters()
+            c.cb = ctypes.sizeof(c)
+            ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(c), c.cb)
+            return c.WorkingSetSize / 1048576, c.PeakWorkingSetSize / 1048576
+        except Exception:
+            return None, None
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 는 KB, macOS 는 byte 단위
+        peak = peak / 1048576 if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        peak = None
+    try:
+        with open("/proc/self/statm") as f: current = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1048576
+    except (OSError, ValueError, AttributeError):
+        current = None
+    return current, peak
+
+def configure(argv, log_dir):
+    # --trace / --profile 옵션을 떼어 내고 나머지 인자를 돌려줌
+    global enabled, _logger
+    argv = list(argv)
+    trace = os.environ.get("PORTRAITS_TRACE", "") not in ("", "0")
+    profile = os.environ.get("PORTRAITS_PROFILE", "") not in ("", "0")
+    if "--trace" in argv: argv.remove("--trace"); trace = True
+    if "--profile" in argv: argv.remove("--profile"); profile = True
+    if trace or profile:
+        import logging
+        from logging.handlers import RotatingFileHandler
+        os.makedirs(log_dir, exist_ok=True)
+        _logger = logging.getLogger("portraits.trace")
+        _logger.propagate = False
+        handler = RotatingFileHandler(os.environ.get("PORTRAITS_TRACE_LOG") or os.path.join(log_dir, LOG_NAME), maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        _logger.addHandler(handler)
+        _logger.setLevel(logging.INFO)
+        enabled = True
+        record("session_start", argv=argv, pid=os.getpid())
+    if profile: start_profile(log_dir)
+    return argv
+
+def record(name, **fields):
+    if not enabled: return
+    import json
+    fields = {"ts": time.strftime("%Y-%m-%dT%H:%M:%S"), "stage": name, "thread": threading.current_thread().name, **fields}
+    _logger.info(json.dumps(fields, ensure_ascii=False, default=str))
+
+@contextmanager
+def stage(name, **fields):
+    if not enabled:
+        yield
+        return
+    token = object()
+    if _profile: _start_peak(token)
+    t = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = repr(e)
+        raise
+    finally:
+        ms = (time.perf_counter() - t) * 1000
+        rss, peak = memory_mb()
+        peak_kb = _end_peak(token) if _profile else None
+        extra = {"py_peak_kb": peak_kb} if peak_kb is not None else {}
+        record(name, ms=round(ms, 3), rss_mb=rss and round(rss, 1), peak_rss_mb=peak and round(peak, 1), error=error, **extra, **fields)
+
+def _start_peak(token):
+    tid = threading.get_ident()
+    with _stage_lock:
+        if not _running:
+            _profile["tracemalloc"].reset_peak()
+            _peak["owner"], _peak["clean"] = token, True
+        elif tid not in _running:
+            _peak["clean"] = False
+        _running[tid] = _running.get(tid, 0) + 1
+
+def _end_peak(token):
+    # 이 단계가 최대치를 혼자 잰 경우에만 KB 값, 아니면 None
+    tid = threading.get_ident()
+    with _stage_lock:
+        _running[tid] -= 1
+        if not _running[tid]: del _running[tid]
+        if _peak["owner"] is not token: return None
+        _peak["owner"] = None
+        return _profile["tracemalloc"].get_traced_memory()[1] // 1024 if _peak["clean"] else None
+
+def traced(name):
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kw):
+            if not enabled: return fn(*args, **kw)
+            with stage(name): return fn(*args, **kw)
+        return inner
+    return wrap
+
+def start_profile(log_dir):
+    # 메인 스레드의 cProfile 과 전체 tracemalloc 기록. 종료 시 버그 리포트에 첨부할 파일로 저장
+    global _profile
+    import cProfile
+    import tracemalloc
+    tracemalloc.start(10)
+    prof = cProfile.Profile()
+    prof.enable()
+    _profile = {"cprofile": prof, "tracemalloc": tracemalloc, "dir": log_dir, "stamp": time.strftime("%Y%m%d-%H%M%S")}
+    atexit.register(stop_profile)
+
+def stop_profile():
+    global _profile
+    if not _profile: return
+    prof, tm = _profile["cprofile"], _profile["tracemalloc"]
+    prof.disable()
+    base = os.path.join(_profile["dir"], f"portraits-{_profile['stamp']}")
+    prof.dump_stats(base + ".prof")
+    snapshot = tm.take_snapshot()
+    current, peak = tm.get_traced_memory()
+    tm.stop()
+    with open(base + "-memory.txt", "w", encoding="utf-8") as f:
+        f.write(f"traced current {current / 1024:.0f} KB, peak {peak / 1024:.0f} KB\n\n")
+        for stat in snapshot.statistics("lineno")[:50]: f.write(f"{stat}\n")
+    record("session_end", profile=base + ".prof", memory=base + "-memory.txt")
+    _profile = None
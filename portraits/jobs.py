@@ -0,0 +1,85 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+class Cancelled(Exception):
+    pass
+
+class Job:
+    def __init__(self, kind, title, callbacks):
+        self.kind, self.title = kind, title
+        self.callbacks = callbacks
+        self.cancel_event = threading.Event()
+        self.superseded = False
+        self.progress = (0, 0)
+        self.started = time.monotonic()
+        self.future = None
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def report(self, done, total):
+        # 작업 스레드에서 호출. 취소 요청이 있으면 여기서 중단
+        self.progress = (done, total)
+        if self.cancelled: raise Cancelled()
+
+class JobRunner:
+    # Pillow 작업은 작업 스레드에서 실행하고, 결과는 after() 폴링으로 Tk 메인 스레드에 전달
+    def __init__(self, root, on_change=None, poll_ms=15):
+        self.root = root
+        self.on_change = on_change
+        self.poll_ms = poll_ms
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="portraits-job")
+        self.jobs = {}
+
+    def busy(self, kind=None):
+        return bool(self.jobs) if kind is None else kind in self.jobs
+
+    def current(self):
+        return next(reversed(self.jobs.values()), None)
+
+    def submit(self, kind, title, fn, *args, on_done=None, on_error=None, on_cancel=None):
+        # 같은 종류의 이전 작업은 결과를 버림
+        self.discard(kind)
+        job = Job(kind, title, (on_done, on_error, on_cancel))
+        job.future = self.executor.submit(fn, job, *args)
+        self.jobs[kind] = job
+        self._changed()
+        self.root.after(self.poll_ms, self._poll, job)
+        return job
+
+    def cancel(self, kind):
+        # 작업이 실제로 멈출 때까지 목록에 남겨 두고, 멈추면 on_cancel 호출
+        if kind in self.jobs: self.jobs[kind].cancel_event.set()
+
+    def discard(self, kind):
+        job = self.jobs.pop(kind, None)
+        if not job: return
+        job.superseded = True
+        job.cancel_event.set()
+        self._changed()
+
+    def shutdown(self):
+        for job in self.jobs.values(): job.cancel_event.set()
+        self.jobs.clear()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _changed(self):
+        if self.on_change: self.on_change()
+
+    def _poll(self, job):
+        if not job.future.done():
+            if not job.superseded: self._changed()
+            self.root.after(self.poll_ms, self._poll, job)
+            return
+        if job.superseded: return
+        if self.jobs.get(job.kind) is job: del self.jobs[job.kind]
+        self._changed()
+        on_done, on_error, on_cancel = job.callbacks
+        err = job.future.exception()
+        if isinstance(err, Cancelled):
+            if on_cancel: on_cancel()
+        elif err is not None:
+            if on_error: on_error(err)
+        elif on_done: on_done(job.future.result())
@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+
+from PIL import Image
+
+from portraits import engine, resample
+
+# 원본 이미지 옆에 자르기 영역을 기록하는 파일 (<원본>.portraits.json)
+# 게임별로 정규화된(0~1) 자르기 영역, 게임 설정, 저장한 출력의 지문을 두고
+# reexport 는 원본/자르기/설정이 바뀐 출력만 다시 만듦
+
+SUFFIX = ".portraits.json"
+VERSION = 1
+
+def manifest_path(source_path):
+    return source_path + SUFFIX
+
+def normalize(box, img_size):
+    w, h = img_size
+    return [round(box[0] / w, 6), round(box[1] / h, 6), round(box[2] / w, 6), round(box[3] / h, 6)]
+
+def denormalize(norm, img_size):
+    # 기록된 영역은 GUI 에서 이미 가장자리를 붙인 것이므로 반올림만 함 (확대 중 붙임 거리가 EDGE_SNAP 보다 작음)
+    w, h = img_size
+    return engine.snap_crop_box((norm[0] * w, norm[1] * h, norm[2] * w, norm[3] * h), img_size, snap=1)
+
+def load(path):
+    try:
+        with open(path, encoding="utf-8") as f: data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return data if isinstance(data, dict) and data.get("version") == VERSION else None
+
+def save(data, path):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f: json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+def saved_crops(data, source_hash, game):
+    # 같은 원본에 대해 이 게임으로 골라 둔 자르기 영역 {단계: 정규화 영역}
+    if not data or data.get("source_hash") != source_hash: return {}
+    return data.get("games", {}).get(game, {}).get("crops", {})
+
+def fingerprint(source_hash, game, label, norm_box, high_res, preset, out_path, quantize_opts=None):
+    # 출력 하나의 픽셀을 정하는 모든 입력. 하나라도 바뀌면 다시 만듦
+    # 고해상도는 EE 출력에만, 양자화 설정은 256색 출력에만 영향을 주므로 그때만 넣음
+    key = [source_hash, game, label, norm_box, engine.GAME_CONFIGS[game], preset, os.path.abspath(out_path)]
+    if game == engine.EE_GAME: key.append(high_res)
+    if engine.uses_palette(game, label): key.append(engine.palette_options(quantize_opts))
+    return hashlib.sha1(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+def output_path(base_dir, game, name, label):
+    return os.path.join(engine.output_dir(base_dir, game, name), engine.output_filename(game, name, label))
+
+def record(source_path, source_hash, img_size, name, crops, high_res=False, preset=resample.DEFAULT_PRESET, base_dir=None):
+    # crops: {게임: {단계: 원본 좌표 영역}}. base_dir 를 주면 저장한 것으로 보고 출력 지문도 기록
+    path = manifest_path(source_path)
+    data = load(path)
+    if not data or data.get("source_hash") != source_hash: data = {"version": VERSION, "games": {}}
+    data.update(source=os.path.basename(source_path), source_hash=source_hash, source_size=list(img_size), name=name)
+    for game, boxes in crops.items():
+        entry = data["games"].setdefault(game, {})
+        entry["crops"] = {label: normalize(box, img_size) for label, box in boxes.items()}
+        entry.update(high_res=high_res, preset=preset, profile=engine.GAME_CONFIGS[game])
+        if base_dir:
+            entry["output_dir"] = os.path.abspath(base_dir)
+            entry["outputs"] = {label: fingerprint(source_hash, game, label, norm, high_res, preset, output_path(base_dir, game, name, label))
+                                for label, norm in entry["crops"].items()}
+    save(data, path)
+    return data
+
+def plan_crops(plan):
+    # plan_exports 결과에서 {게임: {단계: 영역}}
+    crops = {}
+    for (box, _), targets in plan.items():
+        for game, label in targets: crops.setdefault(game, {})[label] = box
+    return crops
+
+def find_manifests(root, recursive=True):
+    if os.path.isfile(root):
+        yield root
+        return
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.endswith(SUFFIX): yield os.path.join(dirpath, filename)
+        if not recursive: break
+
+def reexport(path, out_dir=None, force=False, high_res=None, preset=None, png_preset=engine.DEFAULT_PNG_PRESET, cache_opts=None, source_path=None, quantize_opts=None):
+    # 기록된 출력 지문과 다른 출력만 다시 만들고 기록을 갱신함. 다시 만들 출력도 출력 캐시에 있으면 복사만 함
+    # source_path: 기록과 함께 옮겨져 이름이 바뀐 원본 (감시 모드)
+    result = {"path": path, "written": [], "skipped": 0, "cache": (0, 0), "error": None}
+    output_cache = engine.get_output_cache(cache_opts) if cache_opts is not None else None
+    hits = misses = 0
+    try:
+        data = load(path)
+        if not data: raise ValueError("기록 파일을 읽을 수 없습니다")
+        source_path = source_path or os.path.join(os.path.dirname(path), data["source"])
+        source_hash = engine.file_hash(source_path)
+        name = data["name"]
+        engine.load_plugins()
+        with Image.open(source_path) as src:
+            src.load()
+            for game, entry in data["games"].items():
+                if game not in engine.GAME_CONFIGS or not entry.get("crops"): continue
+                hr = entry.get("high_res", False) if high_res is None else high_res
+                pre = preset or entry.get("preset", resample.DEFAULT_PRESET)
+                base_dir = out_dir or entry.get("output_dir") or os.path.dirname(path)
+                crops = {label: denormalize(norm, src.size) for label, norm in entry["crops"].items()}
+                plan = engine.plan_exports(list(crops.values()), src.size, [game], hr, fixed={(game, label): box for label, box in crops.items()})
+                outputs = entry.setdefault("outputs", {})
+                for (box, size), targets in plan.items():
+                    todo = []
+                    for g, label in targets:
+                        norm = entry["crops"].get(label) or normalize(box, src.size)
+                        out = output_path(base_dir, g, name, label)
+                        fp = fingerprint(source_hash, g, label, norm, hr, pre, out, quantize_opts)
+                        if force or outputs.get(label) != fp or not os.path.exists(out): todo.append((label, out, fp))
+                        else: result["skipped"] += 1
+                    if not todo: continue
+                    img = None
+                    os.makedirs(engine.output_dir(base_dir, game, name), exist_ok=True)
+                    for label, out, fp in todo:
+                        key = engine.output_key(source_hash, box, size, pre, game, label, png_preset, quantize_opts) if output_cache else None
+                        if key and output_cache.fetch(key, out): hits += 1
+                        else:
+                            if key: misses += 1
+                            if img is None: img = engine.render_box(src, box, size, pre)
+                            engine.encode_portrait(img, out, game, label, engine.get_quantizer(quantize_opts), png_preset)
+                            if key: output_cache.store(key, out)
+                        outputs[label] = fp
+                        result["written"].append(out)
+                entry.update(high_res=hr, preset=pre, profile=engine.GAME_CONFIGS[game], output_dir=os.path.abspath(base_dir))
+        data["source_hash"] = source_hash
+        save(data, path)
+    except Exception as e:
+        result["error"] = str(e)
+    result["cache"] = (hits, misses)
+    return result
+
+def run_reexport(paths, workers=None, **options):
+    # run_batch 와 같이 끝나는 순서대로 내보내고 대기 작업 수를 제한함
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for path in paths:
+            pending.add(pool.submit(reexport, path, **options))
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done: yield future.result()
+        for future in as_completed(pending): yield future.result()
@@ -0,0 +1,72 @@
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+from portraits import engine, instrument
+
+# GUI 가 이미지를 연달아 불러올 때의 메모리 사용량을 화면 없이 재현해 최대 RSS 를 확인함
+
+# 두 번째 불러오기 이후 허용할 최대 RSS 증가량 (MB). 40MP 원본 한 장이 해제되지 않으면 100MB 를 넘게 늘어남
+MAX_GROWTH_MB = 100
+
+def peak_rss_mb():
+    return instrument.memory_mb()[1]
+
+def make_source(path, megapixels, seed):
+    w = int((megapixels * 1_000_000 * 4 / 3) ** 0.5)
+    h = int(w * 3 / 4)
+    noise = Image.effect_noise((w // 8, h // 8), 40 + seed).resize((w, h), Image.BILINEAR)
+    # 형식은 확장자로 결정 (jpg / png / webp)
+    Image.merge("RGB", (noise, noise.rotate(90, expand=False), noise.transpose(Image.FLIP_LEFT_RIGHT))).save(path, quality=90)
+    return path
+
+def simulate_loads(paths, game, report=None, work_dir=None):
+    # PortraitMaker 의 실제 메서드를 가짜 Tk 위젯 위에서 호출함 (bench.make_app):
+    # 작업 스레드 디코딩 -> on_image_loaded (이전 이미지 해제 포함) -> 단계마다 next_step (미리 만들기) -> 검토 미리보기
+    from portraits import bench
+    main = bench.load_app_class()
+    # 화면 없이 실행하므로 PhotoImage 변환은 건너뜀
+    main.ImageTk = type("FakeImageTk", (), {"PhotoImage": staticmethod(lambda img: img)})
+    app = bench.make_app(main, work_dir or tempfile.gettempdir())
+    app.game_select.values["value"] = game
+
+    def fail(e):
+        raise e
+
+    app.on_image_error = fail
+    samples = []
+    try:
+        for serial, path in enumerate(paths, 1):
+            app.queue, app.queue_idx = [path], 0
+            app.on_image_loaded(main.PortraitMaker.decode_image(bench.FakeJob(), path, bench.SCREEN_SIZE))
+            for _ in app.current_steps: app.next_step()
+            # 마지막 단계 뒤 show_review 가 넘긴 미리보기 작업이 끝날 때까지 기다림
+            app.jobs.jobs["review"].future.result()
+            samples.append(peak_rss_mb())
+            if report: report(serial, path, samples[-1])
+    finally:
+        app.release_image()
+        app.on_close()
+    return samples
+
+def run(loads=6, megapixels=40, game=engine.EE_GAME, max_growth_mb=MAX_GROWTH_MB, work_dir=None):
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+        # 합성 이미지는 별도 프로세스에서 만들어 측정 대상 프로세스의 최대 RSS 에 섞이지 않게 함
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            sources = list(pool.map(make_source, [os.path.join(tmp, f"source{i}.jpg") for i in range(2)], [megapixels] * 2, range(2)))
+        paths = [sources[i % len(sources)] for i in range(loads)]
+        samples = simulate_loads(paths, game, work_dir=tmp, report=lambda n, p, mb: print(f"[{n}/{loads}] {os.path.basename(p)} 최대 RSS {mb:.0f} MB" if mb else f"[{n}/{loads}] {os.path.basename(p)}"))
+    if samples[0] is None:
+        print("이 플랫폼에서는 RSS 를 측정할 수 없습니다.")
+        return 0
+    # 첫 두 장을 불러온 뒤의 최대치가 이후 계속 늘어나면 이전 이미지가 해제되지 않은 것
+    baseline = samples[min(1, len(samples) - 1)]
+    growth = samples[-1] - baseline
+    print(f"최대 RSS: {samples[-1]:.0f} MB (두 번째 불러오기 이후 증가량 {growth:.0f} MB)")
+    if max_growth_mb is not None and growth > max_growth_mb:
+        print(f"실패: 증가량이 한도 {max_growth_mb} MB 를 넘었습니다.", file=sys.stderr)
+        return 1
+    return 0
@@ -0,0 +1,62 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from portraits import autocrop, engine, preview
+
+# 여러 장을 끌어다 놓았을 때, 지금 이미지를 자르는 동안 다음 이미지들을 미리 디코딩해 둠
+# 결과는 PortraitMaker.decode_image 와 같은 (원본, 화면 피라미드, 경로, 해시, 자동 자르기 추천)
+
+DEFAULT_AHEAD = 2
+
+def prefetch_ahead():
+    # PORTRAITS_PREFETCH 환경 변수로 조절 (0 이면 끔)
+    try: return max(0, int(os.environ.get("PORTRAITS_PREFETCH", DEFAULT_AHEAD)))
+    except ValueError: return DEFAULT_AHEAD
+
+def load_entry(path, max_size):
+    engine.load_plugins()
+    img, pyramid = preview.load_source(path, max_size)
+    # 자동 자르기 추천은 피라미드의 가장 작은 단계로 계산 (수십 ms)
+    return img, pyramid, path, engine.file_hash(path), autocrop.CropProposer.from_pyramid(pyramid)
+
+def release(future):
+    # 쓰지 않게 된 결과를 닫음. 아직 실행 중이면 끝난 뒤에 닫음
+    if future.cancel(): return
+    def close(f):
+        if f.cancelled() or f.exception(): return
+        img, pyramid = f.result()[:2]
+        pyramid.close()
+        img.close()
+    future.add_done_callback(close)
+
+class Prefetcher:
+    def __init__(self, ahead=None):
+        self.ahead = prefetch_ahead() if ahead is None else ahead
+        # 한 번에 한 장씩 순서대로 디코딩 (다음 이미지가 가장 먼저 준비되도록)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="portraits-prefetch")
+        self.futures = {}
+        self.lock = threading.Lock()
+
+    def request(self, paths, max_size):
+        # paths 중 앞의 ahead 장만 미리 디코딩하고, 목록에서 빠진 결과는 버림
+        wanted = list(paths)[:self.ahead]
+        with self.lock:
+            stale = [self.futures.pop(p) for p in list(self.futures) if p not in wanted]
+            for path in wanted:
+                if path not in self.futures: self.futures[path] = self.executor.submit(load_entry, path, max_size)
+        for future in stale: release(future)
+
+    def take(self, path):
+        # 미리 디코딩 중이거나 끝난 결과의 future. 가져간 쪽이 결과를 책임짐
+        with self.lock: return self.futures.pop(path, None)
+
+    def clear(self):
+        with self.lock:
+            stale = list(self.futures.values())
+            self.futures.clear()
+        for future in stale: release(future)
+
+    def shutdown(self):
+        self.clear()
+        self.executor.shutdown(wait=False, cancel_futures=True)
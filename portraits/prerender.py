@@ -0,0 +1,39 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from portraits import engine
+
+class Prerenderer:
+    # 자르기가 확정되면 최종 출력 이미지를 미리 만들어 둠.
+    # 키는 (이미지 번호, 자르기 영역, 출력 크기) 라서 게임/모드가 달라도 같은 결과는 한 번만 만듦
+    def __init__(self, max_workers=None):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or min(4, os.cpu_count() or 1), thread_name_prefix="portraits-render")
+        self.futures = {}
+        self.lock = threading.Lock()
+
+    def request(self, serial, source, box, size):
+        key = (serial, tuple(box), tuple(size))
+        with self.lock:
+            if key not in self.futures:
+                self.futures[key] = self.executor.submit(engine.render_box, source, box, size)
+        return key
+
+    def result(self, key):
+        with self.lock: future = self.futures.get(key)
+        if future is None: raise KeyError(key)
+        return future.result()
+
+    def discard(self, keys):
+        with self.lock:
+            for key in keys:
+                future = self.futures.pop(key, None)
+                if future: future.cancel()
+
+    def clear(self):
+        with self.lock: keys = list(self.futures)
+        self.discard(keys)
+
+    def shutdown(self):
+        self.clear()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,117 @@
+import os
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+# 피라미드의 가장 작은 단계 크기 (짧은 변 기준)
+MIN_LEVEL_SIDE = 256
+
+# 미리보기 캐시 메모리 한도 (PORTRAITS_PREVIEW_MB 환경 변수로 변경)
+DEFAULT_PREVIEW_MB = 256
+
+def preview_budget():
+    try: return max(1, int(os.environ.get("PORTRAITS_PREVIEW_MB", DEFAULT_PREVIEW_MB))) * 1024 * 1024
+    except ValueError: return DEFAULT_PREVIEW_MB * 1024 * 1024
+
+def image_bytes(img):
+    return img.width * img.height * len(img.getbands())
+
+def display_mode(img):
+    # PhotoImage / reduce 가 바로 다룰 수 있는 모드로 맞춤
+    if img.mode in ("RGB", "RGBA", "L"): return img
+    return img.convert("RGBA" if "A" in img.getbands() or "transparency" in img.info else "RGB")
+
+class DisplayPyramid:
+    # 화면 표시용 축소본 묶음. 이미지당 한 번 만들고, 창 크기가 바뀌면 가장 가까운 단계만 리샘플링함
+    def __init__(self, base, source_size):
+        self.source_size = source_size
+        self.levels = [base]
+        while min(self.levels[-1].size) >= MIN_LEVEL_SIDE * 2:
+            self.levels.append(self.levels[-1].reduce(2))
+
+    @classmethod
+    def from_path(cls, path, max_size):
+        with Image.open(path) as img:
+            source_size = img.size
+            # JPEG 는 디코딩 단계에서 1/2 ~ 1/8 크기로 바로 읽음 (다른 형식은 무시됨)
+            img.draft("RGB", max_size)
+            img.load()
+            base = display_mode(img)
+        factor = min(base.width // max_size[0], base.height // max_size[1])
+        if factor > 1: base = base.reduce(factor)
+        return cls(base, source_size)
+
+    @classmethod
+    def from_image(cls, img, max_size):
+        # 이미 디코딩한 원본에서 만듦. 피라미드를 닫아도 원본은 남도록 줄이지 않을 때는 사본을 씀
+        base = display_mode(img)
+        factor = min(base.width // max_size[0], base.height // max_size[1])
+        if factor > 1: base = base.reduce(factor)
+        elif base is img: base = img.copy()
+        return cls(base, img.size)
+
+    def close(self):
+        for level in self.levels: level.close()
+        self.levels = []
+
+    def level_for(self, size):
+        best = self.levels[0]
+        for level in self.levels[1:]:
+            if level.width < size[0] or level.height < size[1]: break
+            best = level
+        return best
+
+    def render(self, size):
+        level = self.level_for(size)
+        if level.size == tuple(size): return level
+        return level.resize(size, Image.LANCZOS)
+
+    def render_region(self, box, size, source=None):
+        # box 는 원본 좌표. 해당 영역을 size 이상으로 담고 있는 가장 작은 단계에서 리샘플링
+        sw, sh = self.source_size
+        bw, bh = box[2] - box[0], box[3] - box[1]
+        best = self.levels[0]
+        for level in self.levels[1:]:
+            if bw * level.width / sw < size[0] or bh * level.height / sh < size[1]: break
+            best = level
+        if source is not None and (bw * best.width / sw < size[0] or bh * best.height / sh < size[1]):
+            # 가장 큰 단계로도 부족하면 원본에서 직접 리샘플링
+            return source.resize(size, Image.LANCZOS, box=box)
+        sx, sy = best.width / sw, best.height / sh
+        return best.resize(size, Image.LANCZOS, box=(box[0] * sx, box[1] * sy, box[2] * sx, box[3] * sy))
+
+def load_source(path, max_size):
+    # 원본 전체 디코딩과 화면 표시용 피라미드 생성. 원본 파일 핸들은 load() 후 닫힘
+    # JPEG 는 draft 로 작게 다시 읽는 편이 빠르고, 다른 형식은 디코딩한 원본을 줄여 씀 (두 번 디코딩하지 않음)
+    img = Image.open(path)
+    img.load()
+    return img, DisplayPyramid.from_path(path, max_size) if img.format == "JPEG" else DisplayPyramid.from_image(img, max_size)
+
+class PreviewCache:
+    # (이미지 번호, 자르기 영역, 출력 크기) 를 키로 하는 LRU 캐시. 작업 스레드에서도 사용함
+    # 전체 크기가 max_bytes 를 넘으면 오래된 것부터 버림
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes or preview_budget()
+        self.used = 0
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, render):
+        with self.lock:
+            if key in self.items:
+                self.items.move_to_end(key)
+                return self.items[key]
+        value = render()
+        with self.lock:
+            if key not in self.items:
+                self.items[key] = value
+                self.used += image_bytes(value)
+            while self.used > self.max_bytes and len(self.items) > 1:
+                self.used -= image_bytes(self.items.popitem(last=False)[1])
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+            self.used = 0
@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from PIL import Image, features
+
+from portraits import resample
+
+# 256색 BMP (Classics Small) 용 팔레트 양자화
+# 팔레트는 원본 픽셀 해시로 캐시해서, 같은 이미지를 다시 내보낼 때는 팔레트 계산을 건너뜀
+
+METHODS = {
+    "mediancut": Image.Quantize.MEDIANCUT,
+    "fastoctree": Image.Quantize.FASTOCTREE,
+    "libimagequant": Image.Quantize.LIBIMAGEQUANT,
+}
+DEFAULT_METHOD = "mediancut"
+
+def available_methods():
+    return [m for m in METHODS if m != "libimagequant" or features.check_feature("libimagequant")]
+
+def content_hash(images, *params):
+    h = hashlib.sha1(repr(params).encode())
+    for img in images:
+        h.update(f"{img.mode}{img.size}".encode())
+        h.update(img.tobytes())
+    return h.hexdigest()
+
+class Quantizer:
+    def __init__(self, method=DEFAULT_METHOD, colors=256, dither=False, cache_dir=None):
+        if method not in METHODS: raise ValueError(f"알 수 없는 양자화 방식: {method}")
+        if method not in available_methods(): raise ValueError(f"{method} 를 사용할 수 없습니다 (Pillow 가 libimagequant 없이 빌드됨)")
+        self.method, self.colors, self.dither = method, colors, dither
+        self.cache_dir = cache_dir
+        self.palettes = {}
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def _cache_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".json")
+
+    def _lookup(self, key):
+        with self.lock:
+            if key in self.palettes: return self.palettes[key]
+        if self.cache_dir:
+            try:
+                with open(self._cache_path(key), encoding="utf-8") as f: palette = json.load(f)
+            except (OSError, ValueError):
+                return None
+            with self.lock: self.palettes[key] = palette
+            return palette
+        return None
+
+    def _store(self, key, palette):
+        with self.lock: self.palettes[key] = palette
+        if not self.cache_dir: return
+        path = self._cache_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 다른 프로세스와 겹쳐 써도 깨지지 않도록 임시 파일에 쓴 뒤 교체
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f: json.dump(palette, f)
+        os.replace(tmp, path)
+
+    def palette_for(self, images):
+        # 여러 이미지를 한 줄로 이어 붙여 공통 팔레트 하나를 만듦 (캐릭터 묶음 / 일괄 처리용)
+        images = [img.convert("RGB") for img in images]
+        key = content_hash(images, self.method, self.colors)
+        palette = self._lookup(key)
+        if palette is not None:
+            self.hits += 1
+            return palette
+        self.misses += 1
+        if len(images) == 1:
+            sheet = images[0]
+        else:
+            sheet = Image.new("RGB", (sum(img.width for img in images), max(img.height for img in images)))
+            x = 0
+            for img in images:
+                sheet.paste(img, (x, 0))
+                x += img.width
+        palette = sheet.quantize(self.colors, METHODS[self.method]).getpalette()
+        self._store(key, palette)
+        return palette
+
+    def apply(self, img, palette=None):
+        # palette 가 없으면 이미지 자신의 팔레트를 사용 (캐시됨)
+        img = img.convert("RGB")
+        if palette is None: palette = self.palette_for([img])
+        pal_img = Image.new("P", (1, 1))
+        pal_img.putpalette(palette)
+        return img.quantize(palette=pal_img, dither=Image.Dither.FLOYDSTEINBERG if self.dither else Image.Dither.NONE)
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+def get_quantizer(method=DEFAULT_METHOD, colors=256, dither=False, cache_dir=None):
+    # 같은 설정이면 프로세스 안에서 하나의 Quantizer(메모리 캐시) 를 공유
+    key = (method, colors, dither, cache_dir)
+    with _shared_lock:
+        if key not in _shared: _shared[key] = Quantizer(method, colors, dither, cache_dir)
+        return _shared[key]
+
+def compare_methods(images, colors=256, repeat=3):
+    # 방식별 소요 시간(가장 빠른 회차)과 원본 대비 PSNR. 개별 팔레트와 공통 팔레트 모두 측정
+    rows = []
+    for method in available_methods():
+        for shared in (False, True):
+            for dither in (False, True):
+                best = cached = float("inf")
+                for _ in range(repeat):
+                    q = Quantizer(method, colors, dither)
+                    for attempt in range(2):
+                        # 두 번째 회차는 팔레트 캐시 적중 (다시 내보내기)
+                        t = time.perf_counter()
+                        palette = q.palette_for(images) if shared else None
+                        outs = [q.apply(img, palette) for img in images]
+                        sec = time.perf_counter() - t
+                        if attempt: cached = min(cached, sec)
+                        else: best = min(best, sec)
+                score = sum(resample.psnr(img, out) for img, out in zip(images, outs)) / len(images)
+                rows.append({"method": method, "shared": shared, "dither": dither, "seconds": best, "cached_seconds": cached, "psnr": score})
+    return rows
@@ -0,0 +1,104 @@
+import os
+import platform
+import select
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+# 프로그램 시작 시간 벤치마크
+# import: 새 파이썬 프로세스에서 main 모듈과 처리 모듈(main.load_modules) 을 불러오는 시간
+# gui: 프로그램을 실행한 때부터 첫 화면(first_frame), 조작 패널 준비(ready), 끌어다 놓기 준비(drop) 까지의 시간
+# GUI 측정은 화면이 필요함. Linux 에서 DISPLAY 가 없으면 Xvfb 가상 화면을 띄워서 씀 (CI 용)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(ROOT, "main.py")
+MARKS = ("first_frame", "ready", "drop")
+XVFB_SCREEN = "1920x1080x24"
+
+IMPORT_PROBE = (
+    "import time; t = time.perf_counter(); import main; a = time.perf_counter(); "
+    "main.load_modules(); print(a - t, time.perf_counter() - a)"
+)
+
+def import_times():
+    # (import main, load_modules) 초. 매번 새 프로세스라서 모듈 캐시 없이 측정됨
+    out = subprocess.run([sys.executable, "-c", IMPORT_PROBE], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    main_s, modules_s = out.split()[-2:]
+    return float(main_s), float(modules_s)
+
+def gui_command():
+    return [sys.executable] if getattr(sys, "frozen", False) else [sys.executable, MAIN]
+
+def launch_gui(env, timeout=60):
+    # PORTRAITS_STARTUP_PROBE 로 실행해서 단계 알림("startup <단계> <ms>") 을 받은 시각을 잼. 준비가 끝나면 프로그램이 스스로 종료함
+    marks = {}
+    t = time.perf_counter()
+    proc = subprocess.Popen(gui_command(), cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, encoding="utf-8", errors="replace")
+    timer = threading.Timer(timeout, proc.kill)
+    timer.start()
+    try:
+        for line in proc.stdout:
+            parts = line.split()
+            if len(parts) == 3 and parts[0] == "startup": marks[parts[1]] = time.perf_counter() - t
+        proc.wait()
+    finally:
+        timer.cancel()
+        proc.stdout.close()
+    return marks
+
+def start_xvfb(timeout=10):
+    # 빈 디스플레이 번호를 Xvfb 가 골라 -displayfd 로 알려 줌 (연결을 받을 준비가 된 뒤). 없거나 실패하면 (None, None)
+    if not shutil.which("Xvfb"): return None, None
+    r, w = os.pipe()
+    proc = subprocess.Popen(["Xvfb", "-displayfd", str(w), "-screen", "0", XVFB_SCREEN, "-nolisten", "tcp"], pass_fds=(w,), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.close(w)
+    try:
+        number = os.read(r, 64).decode().strip() if select.select([r], [], [], timeout)[0] else ""
+    finally:
+        os.close(r)
+    if not number:
+        proc.kill()
+        proc.wait()
+        return None, None
+    return proc, f":{number}"
+
+def needs_display():
+    return sys.platform not in ("win32", "darwin") and not os.environ.get("DISPLAY")
+
+def run(repeat=5, use_xvfb=True, timeout=60, log=print):
+    # bench.run 과 같은 형식 ({meta, results}, 초 단위, 가장 빠른 값) 이라서 bench-compare 로 비교할 수 있음
+    results = {}
+    if not getattr(sys, "frozen", False):
+        samples = [import_times() for _ in range(repeat)]
+        results["import/main"] = min(s[0] for s in samples)
+        results["import/modules"] = min(s[1] for s in samples)
+        log(f"import main {results['import/main'] * 1000:.1f} ms, 처리 모듈(load_modules) {results['import/modules'] * 1000:.1f} ms")
+    env = dict(os.environ, PORTRAITS_STARTUP_PROBE="1")
+    xvfb, display = None, "native"
+    if needs_display():
+        xvfb, number = start_xvfb() if use_xvfb else (None, None)
+        if xvfb: env["DISPLAY"] = number
+        display = "xvfb" if xvfb else None
+    try:
+        if display:
+            runs = [launch_gui(env, timeout) for _ in range(repeat)]
+            for mark in MARKS:
+                values = [r[mark] for r in runs if mark in r]
+                if values: results[f"gui/{mark}"] = min(values)
+            if len(runs[-1]) < len(MARKS): log(f"프로그램이 준비를 마치지 못했습니다 (받은 단계: {', '.join(runs[-1]) or '없음'})")
+            log("  ".join(f"{mark} {results[f'gui/{mark}'] * 1000:.1f} ms" for mark in MARKS if f"gui/{mark}" in results))
+        else:
+            log("화면(DISPLAY) 이 없고 Xvfb 도 없어 첫 화면 시간 측정은 건너뜁니다")
+    finally:
+        if xvfb:
+            xvfb.terminate()
+            xvfb.wait()
+    return {
+        "meta": {
+            "python": platform.python_version(), "platform": platform.platform(), "display": display,
+            "repeat": repeat, "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
@@ -0,0 +1,62 @@
+import math
+import os
+
+from portraits import preview
+
+# 자르기 화면 확대/이동용 타일 뷰
+# 확대 배율(scale: 화면 px / 원본 px) 의 화면 좌표를 TILE 크기 타일로 나누고, 보이는 타일만 만들어 LRU 캐시에 둠
+# 타일은 화면 표시용 피라미드 중 해상도가 충분한 가장 작은 단계에서, 모자라면 원본의 그 영역에서만 리샘플링함
+
+TILE = 256
+ZOOM_STEP = 1.25
+# 원본 1픽셀을 화면 최대 4픽셀로 확대
+MAX_SCALE = 4.0
+
+# 타일 캐시 메모리 한도 (PORTRAITS_TILE_MB 환경 변수로 변경)
+DEFAULT_TILE_MB = 128
+
+def tile_budget():
+    try: return max(1, int(os.environ.get("PORTRAITS_TILE_MB", DEFAULT_TILE_MB))) * 1024 * 1024
+    except ValueError: return DEFAULT_TILE_MB * 1024 * 1024
+
+def max_zoom_level(fit):
+    # 맞춤 배율 fit 에서 MAX_SCALE 까지 ZOOM_STEP 단계 수
+    return max(0, math.ceil(math.log(MAX_SCALE / fit, ZOOM_STEP) - 1e-9)) if fit < MAX_SCALE else 0
+
+def zoom_scale(fit, level):
+    return min(MAX_SCALE, fit * ZOOM_STEP ** level) if level else fit
+
+def clamp_origin(origin, scale, view_size, source_size):
+    # 화면 왼쪽 위에 오는 원본 좌표. 화면이 원본 밖을 보지 않도록 제한
+    return tuple(min(max(0.0, o), max(0.0, src - view / scale)) for o, view, src in zip(origin, view_size, source_size))
+
+class TiledView:
+    def __init__(self, pyramid, source, serial=0, cache=None):
+        self.pyramid, self.source, self.serial = pyramid, source, serial
+        self.cache = cache or preview.PreviewCache(tile_budget())
+        self.rendered = 0
+
+    def visible(self, scale, origin, view_size):
+        # 화면(view_size) 에 보이는 타일의 (키, 화면 안 x, y). 키는 tile() 에 넘김
+        sw, sh = self.source.size
+        full_w, full_h = round(sw * scale), round(sh * scale)
+        left, top = origin[0] * scale, origin[1] * scale
+        x_tiles = range(max(0, int(left // TILE)), min(math.ceil(full_w / TILE), math.ceil((left + view_size[0]) / TILE)))
+        y_tiles = range(max(0, int(top // TILE)), min(math.ceil(full_h / TILE), math.ceil((top + view_size[1]) / TILE)))
+        key_scale = round(scale, 6)
+        return [((key_scale, tx, ty), tx * TILE - left, ty * TILE - top) for ty in y_tiles for tx in x_tiles]
+
+    def tile(self, key):
+        return self.cache.get((self.serial, "tile") + key, lambda: self.render(key))
+
+    def render(self, key):
+        scale, tx, ty = key
+        sw, sh = self.source.size
+        w = min(TILE, round(sw * scale) - tx * TILE)
+        h = min(TILE, round(sh * scale) - ty * TILE)
+        box = (tx * TILE / scale, ty * TILE / scale, min(sw, (tx * TILE + w) / scale), min(sh, (ty * TILE + h) / scale))
+        self.rendered += 1
+        return self.pyramid.render_region(box, (w, h), self.source)
+
+    def clear(self):
+        self.cache.clear()
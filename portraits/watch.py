@@ -0,0 +1,279 @@
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import signal
+import struct
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from portraits import engine, manifest, resample
+
+# 받은 편지함(inbox) 폴더를 지켜보다가 새 이미지가 들어오면 초상화로 변환하는 무인 실행 모드
+# 원본 옆에 자르기 기록(*.portraits.json) 이 있으면 그 영역을, 없으면 자동 자르기 영역을 씀
+# 끝난 원본은 done 폴더로, 실패한 원본은 quarantine 폴더로 옮김
+
+IN_CLOSE_WRITE = 0x08
+IN_MOVED_TO = 0x80
+IN_Q_OVERFLOW = 0x4000
+LATENCY_SAMPLES = 200
+
+class InotifyWatcher:
+    # Linux inotify (ctypes). 쓰기가 끝났거나(close_write) 옮겨 온(moved_to) 파일만 알려 줌
+    # 커널 이벤트 대기열이 넘치면(IN_Q_OVERFLOW) 빠진 파일이 있을 수 있으므로 overflow 를 켬
+    kind = "inotify"
+
+    def __init__(self, path):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0: raise OSError(ctypes.get_errno(), "inotify_init1 실패")
+        if libc.inotify_add_watch(self.fd, os.fsencode(path), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+            err = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(err, "inotify_add_watch 실패")
+        self.path = path
+        self.overflow = False
+
+    def poll(self, timeout):
+        if not select.select([self.fd], [], [], timeout)[0]: return []
+        try: data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError: return []
+        paths, i = [], 0
+        while i + 16 <= len(data):
+            _, mask, _, length = struct.unpack_from("iIII", data, i)
+            name = data[i + 16:i + 16 + length].rstrip(b"\0")
+            i += 16 + length
+            if mask & IN_Q_OVERFLOW: self.overflow = True
+            if name: paths.append(os.path.join(self.path, os.fsdecode(name)))
+        return paths
+
+    def close(self):
+        os.close(self.fd)
+
+class PollingWatcher:
+    # 주기적으로 폴더를 훑음. 크기와 수정 시각이 한 주기 동안 그대로인 파일만 다 써진 것으로 봄
+    kind = "polling"
+
+    def __init__(self, path, interval=1.0):
+        self.path, self.interval = path, interval
+        self.overflow = False
+        self.seen = {}
+        self.reported = set()
+
+    def poll(self, timeout):
+        time.sleep(min(timeout, self.interval))
+        current = {}
+        with os.scandir(self.path) as it:
+            for entry in it:
+                if not entry.is_file(): continue
+                try: st = entry.stat()
+                except OSError: continue
+                current[entry.path] = (st.st_size, st.st_mtime)
+        ready = sorted(p for p, sig in current.items() if self.seen.get(p) == sig and p not in self.reported)
+        self.reported = (self.reported & set(current)) | set(ready)
+        self.seen = current
+        return ready
+
+    def close(self):
+        pass
+
+def make_watcher(path, interval=1.0, polling=False):
+    if sys.platform.startswith("linux") and not polling:
+        try: return InotifyWatcher(path)
+        except (OSError, AttributeError): pass
+    return PollingWatcher(path, interval)
+
+def existing_names(out_dir, games):
+    # 출력 폴더에 이미 있는 캐릭터 이름 (소문자). 다시 실행해도 이전 출력을 덮어쓰지 않도록 사용한 이름으로 둠
+    names = set()
+    for game in games:
+        cfg = engine.GAME_CONFIGS[game]
+        try:
+            with os.scandir(os.path.join(out_dir, engine.safe_game_name(game))) as it: entries = list(it)
+        except OSError:
+            continue
+        for entry in entries:
+            if cfg.get("use_folder"):
+                if entry.is_dir(): names.add(entry.name.lower())
+                continue
+            for suffix in cfg["suffix"].values():
+                ending = f"{suffix}.{cfg['format']}".lower()
+                if len(entry.name) > len(ending) and entry.name.lower().endswith(ending): names.add(entry.name[:-len(ending)].lower())
+    return names
+
+def process_inbox_file(path, games, out_dir, name, high_res=False, preset=resample.DEFAULT_PRESET, png_preset=engine.DEFAULT_PNG_PRESET, cache_opts=None, auto_crop=True):
+    # 작업 프로세스에서 실행. 자르기 기록이 있으면 기록된 게임/영역으로, 없으면 자동 영역으로 name 에 저장
+    mpath = manifest.manifest_path(path)
+    if os.path.exists(mpath):
+        result = manifest.reexport(mpath, out_dir=out_dir, high_res=high_res or None, preset=preset, png_preset=png_preset, cache_opts=cache_opts, source_path=path)
+        return {"path": path, "mode": "manifest", "outputs": result["written"], "error": result["error"]}
+    result = engine.process_file(path, games, out_dir, name, high_res, preset, png_preset=png_preset, cache_opts=cache_opts, auto_crop=auto_crop)
+    return {"path": path, "mode": "auto", "outputs": result["outputs"], "error": result["error"]}
+
+def ignore_interrupt():
+    # Ctrl+C 는 감시 프로세스만 받아서, 넘긴 작업을 마저 끝낸 뒤 멈춤
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+def move_into(path, folder):
+    os.makedirs(folder, exist_ok=True)
+    dest = os.path.join(folder, os.path.basename(path))
+    os.replace(path, dest)
+    return dest
+
+class Metrics:
+    def __init__(self, watcher_kind):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.watcher = watcher_kind
+        self.queued = self.in_flight = self.processed = self.failed = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.last_error = None
+
+    def snapshot(self):
+        with self.lock:
+            lat = sorted(self.latencies)
+            pick = lambda q: round(lat[min(len(lat) - 1, int(q * len(lat)))] * 1000, 1) if lat else None
+            return {
+                "watcher": self.watcher, "pid": os.getpid(),
+                "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+                "updated": time.strftime("%Y-%m-%dT%H:%M:%S"), "uptime_s": round(time.time() - self.started, 1),
+                "queue_depth": self.queued, "in_flight": self.in_flight, "processed": self.processed, "failed": self.failed,
+                "latency_ms": {"last": round(self.latencies[-1] * 1000, 1) if lat else None, "avg": round(sum(lat) / len(lat) * 1000, 1) if lat else None,
+                               "p50": pick(0.5), "p95": pick(0.95), "samples": len(lat)},
+                "last_error": self.last_error,
+            }
+
+def serve_status(metrics, port):
+    # 127.0.0.1:port 에서 GET 요청에 현재 상태 JSON 을 돌려줌
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = json.dumps(metrics.snapshot(), ensure_ascii=False).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    threading.Thread(target=server.serve_forever, name="portraits-status", daemon=True).start()
+    return server
+
+class WatchService:
+    def __init__(self, inbox, games, out_dir, workers=None, max_queue=1000, done_dir=None, quarantine_dir=None,
+                 status_file=None, status_port=None, interval=1.0, polling=False, log=print, **options):
+        # options: process_inbox_file 의 high_res, preset, png_preset, cache_opts, auto_crop
+        self.inbox, self.games, self.out_dir = inbox, games, out_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.done_dir = done_dir or os.path.join(inbox, "done")
+        self.quarantine_dir = quarantine_dir or os.path.join(inbox, "quarantine")
+        self.status_file, self.status_port = status_file, status_port
+        self.interval, self.polling, self.log, self.options = interval, polling, log, options
+        self.waiting = deque()
+        self.known = set()
+        # 자동 자르기 출력에 쓴 캐릭터 이름. 파일마다 따로 정하면 같은 이름끼리 서로 덮어씀
+        self.used = existing_names(out_dir, games)
+        self.overflow = False
+        self.metrics = None
+
+    def enqueue(self, path):
+        # 대기열이 차면 받지 않고, 대기열이 빈 뒤 폴더를 다시 훑어 빠진 파일을 채움
+        if path in self.known or not engine.is_supported_image(path) or not os.path.isfile(path): return
+        if len(self.waiting) >= self.max_queue:
+            self.overflow = True
+            return
+        self.known.add(path)
+        self.waiting.append((path, time.perf_counter()))
+
+    def scan(self):
+        with os.scandir(self.inbox) as it:
+            for entry in sorted(it, key=lambda e: e.name):
+                if entry.is_file(): self.enqueue(entry.path)
+
+    def write_status(self):
+        if not self.status_file: return
+        tmp = f"{self.status_file}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f: json.dump(self.metrics.snapshot(), f, indent=2, ensure_ascii=False)
+        os.replace(tmp, self.status_file)
+
+    @staticmethod
+    def result_of(future, path):
+        try: return future.result()
+        except Exception as e: return {"path": path, "mode": "?", "outputs": [], "error": str(e)}
+
+    def finish(self, path, started, result):
+        with self.metrics.lock:
+            self.metrics.latencies.append(time.perf_counter() - started)
+            if result["error"]:
+                self.metrics.failed += 1
+                self.metrics.last_error = f"{os.path.basename(path)}: {result['error']}"
+            else: self.metrics.processed += 1
+        folder = self.quarantine_dir if result["error"] else self.done_dir
+        try:
+            moved = move_into(path, folder)
+            if os.path.exists(manifest.manifest_path(path)): move_into(manifest.manifest_path(path), folder)
+            if result["error"]:
+                with open(moved + ".error.txt", "w", encoding="utf-8") as f: f.write(result["error"] + "\n")
+        except OSError as e:
+            self.log(f"[경고] {path} 를 옮기지 못했습니다: {e}")
+        self.known.discard(path)
+        if result["error"]: self.log(f"[격리] {path}: {result['error']}")
+        else: self.log(f"[완료] {path} ({result['mode']}, {len(result['outputs'])}개)")
+
+    def step(self, pool, pending, watcher, once):
+        # 대기열에서 작업을 넘기고, 끝난 작업을 정리하고, 새 파일을 받음. 더 할 일이 없으면 False
+        # 작업 프로세스마다 두 개까지만 넘기고 나머지는 대기열에 둠
+        while self.waiting and len(pending) < self.workers * 2:
+            path, started = self.waiting.popleft()
+            name = None if os.path.exists(manifest.manifest_path(path)) else engine.unique_char_name(path, self.used)
+            pending[pool.submit(process_inbox_file, path, self.games, self.out_dir, name, **self.options)] = (path, started)
+        with self.metrics.lock: self.metrics.queued, self.metrics.in_flight = len(self.waiting), len(pending)
+        self.write_status()
+        if once and not pending and not self.waiting: return False
+        if pending:
+            done, _ = wait(pending, timeout=0 if watcher else None, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, started = pending.pop(future)
+                self.finish(path, started, self.result_of(future, path))
+        if watcher:
+            for path in watcher.poll(0.05 if pending else self.interval): self.enqueue(path)
+            if watcher.overflow:
+                watcher.overflow = False
+                self.overflow = True
+        if self.overflow and not self.waiting:
+            self.overflow = False
+            self.scan()
+        return True
+
+    def run(self, stop=None, once=False):
+        # once: 지금 폴더에 있는 파일만 처리하고 끝냄
+        os.makedirs(self.inbox, exist_ok=True)
+        stop = stop or threading.Event()
+        watcher = None if once else make_watcher(self.inbox, self.interval, self.polling)
+        self.metrics = Metrics(watcher.kind if watcher else "once")
+        server = serve_status(self.metrics, self.status_port) if self.status_port is not None else None
+        self.scan()
+        self.log(f"감시 시작: {self.inbox} ({self.metrics.watcher}, 작업 {self.workers}개)")
+        pending = {}
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=ignore_interrupt) as pool:
+                try:
+                    while not stop.is_set() and self.step(pool, pending, watcher, once): pass
+                except KeyboardInterrupt:
+                    self.log("중지 요청: 진행 중인 작업을 마저 끝냅니다")
+                # 이미 넘긴 작업은 끝까지 처리
+                for future, (path, started) in pending.items(): self.finish(path, started, self.result_of(future, path))
+        finally:
+            if watcher: watcher.close()
+            if server: server.shutdown()
+            with self.metrics.lock: self.metrics.queued, self.metrics.in_flight = len(self.waiting), 0
+            self.write_status()
+        return self.metrics.snapshot()